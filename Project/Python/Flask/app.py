@@ -1,21 +1,295 @@
-from flask import Flask, render_template, request, redirect
+from flask import Flask, render_template, request, redirect, jsonify, url_for, make_response, abort
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, bindparam, event, inspect, or_, text, tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
 from datetime import datetime
+from cache import make_cache
+from metrics import init_metrics
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+
+def build_version():
+    """Digest of the code and templates that render cached pages"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = [name for name in os.listdir(root) if name.endswith('.py')]
+    for folder, _, names in os.walk(os.path.join(root, 'templates')):
+        paths.extend(os.path.relpath(os.path.join(folder, name), root) for name in names)
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(path.encode())
+        with open(os.path.join(root, path), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:///todo.db"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', "sqlite:///todo.db")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer, and busy_timeout (ms) makes writers wait instead of failing
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -16000)),  # negative means KiB
+    'temp_store': 'memory',
+}
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+app.config['TODOS_PER_PAGE'] = int(os.environ.get('TODOS_PER_PAGE', 20))
+app.config['TODOS_MAX_PER_PAGE'] = 100
+app.config['API_MAX_BATCH'] = 1000
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'simple')
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+app.config['CACHE_MAX_ENTRIES'] = 256
+app.config['CACHE_TIMEOUT'] = 300
+# Part of every cache key and ETag, so pages rendered by an older deploy are
+# neither served from a shared cache nor confirmed with a 304 afterwards
+app.config['BUILD_VERSION'] = os.environ.get('BUILD_VERSION') or build_version()
+# Request/SQL/template timings and a Prometheus /metrics endpoint; nothing is
+# hooked in at all unless this is on
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '') == '1'
+app.config['METRICS_SLOW_QUERY_MS'] = int(os.environ.get('METRICS_SLOW_QUERY_MS', 100))
+app.config['METRICS_N_PLUS_ONE'] = int(os.environ.get('METRICS_N_PLUS_ONE', 10))
+
+def engine_options(config):
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.drivername.startswith('sqlite'):
+        if url.database in (None, '', ':memory:'):
+            return {}  # Flask-SQLAlchemy pins in-memory databases to one connection
+        # SQLAlchemy opens a fresh connection per checkout for SQLite files by
+        # default; keep a pool so the pragmas are paid once per connection
+        return {
+            'poolclass': QueuePool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'connect_args': {'check_same_thread': False},
+        }
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    }
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
 db = SQLAlchemy(app)
+cache = make_cache(app.config)
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 
 class Todo(db.Model):
     sno = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     desc = db.Column(db.String(500), nullable=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    # Incremented on every update; writers send back the version they read
+    # so a stale form can't silently overwrite another worker's change
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Random token shared by the rows of one bulk API create, so they can be
+    # read back without knowing their snos
+    batch = db.Column(db.String(32))
+
+    # Keyset pagination walks the table in (date_created, sno) order
+    __table_args__ = (
+        db.Index('ix_todo_date_created_sno', 'date_created', 'sno'),
+        db.Index('ix_todo_batch', 'batch'),
+    )
 
     def __repr__(self) -> str:
         return f"{self.sno} - {self.title}"
 
+class TableVersion(db.Model):
+    # Bumped in the same transaction as every write to a table, so cached
+    # pages keyed on it go stale in all gunicorn workers at once
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# External-content FTS5 index over todo, kept in sync by triggers so the
+# ORM routes and the bulk API's Core statements are both covered
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE todo_fts USING fts5(
+        title, "desc", content='todo', content_rowid='sno', tokenize='unicode61')""",
+    """CREATE TRIGGER todo_fts_insert AFTER INSERT ON todo BEGIN
+        INSERT INTO todo_fts(rowid, title, "desc") VALUES (new.sno, new.title, new."desc");
+    END""",
+    """CREATE TRIGGER todo_fts_delete AFTER DELETE ON todo BEGIN
+        INSERT INTO todo_fts(todo_fts, rowid, title, "desc")
+        VALUES ('delete', old.sno, old.title, old."desc");
+    END""",
+    """CREATE TRIGGER todo_fts_update AFTER UPDATE OF title, "desc" ON todo BEGIN
+        INSERT INTO todo_fts(todo_fts, rowid, title, "desc")
+        VALUES ('delete', old.sno, old.title, old."desc");
+        INSERT INTO todo_fts(rowid, title, "desc") VALUES (new.sno, new.title, new."desc");
+    END""",
+    "INSERT INTO todo_fts(todo_fts) VALUES ('rebuild')",
+]
+FTS_OBJECTS = ['todo_fts', 'todo_fts_insert', 'todo_fts_delete', 'todo_fts_update']
+fts_enabled = False
+
+def init_fts():
+    """Create the search index if this engine supports FTS5, returning whether it does"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    # pysqlite runs DDL outside any transaction, so open one by hand: the
+    # table and its triggers appear together or not at all, and the write
+    # lock makes workers starting at once check and create them in turn
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        placeholders = ', '.join('?' * len(FTS_OBJECTS))
+        cursor.execute(f"SELECT count(*) FROM sqlite_master WHERE name IN ({placeholders})", FTS_OBJECTS)
+        if cursor.fetchone()[0] < len(FTS_OBJECTS):
+            # Clear out whatever an interrupted earlier attempt left behind
+            for trigger in FTS_OBJECTS[1:]:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute("DROP TABLE IF EXISTS todo_fts")
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+        cursor.execute("COMMIT")
+    except sqlite3.OperationalError as error:
+        connection.rollback()
+        if 'fts5' not in str(error):
+            raise
+        # SQLite built without FTS5
+        return False
+    finally:
+        connection.close()
+    return True
+
+def create_schema():
+    global fts_enabled
+    db.create_all()
+    if TableVersion.query.get('todo') is None:
+        db.session.add(TableVersion(name='todo', version=0))
+        db.session.commit()
+    # create_all skips tables that already exist, so add any missing columns
+    # and indexes to databases created by older versions of the app
+    columns = {column['name'] for column in inspect(db.engine).get_columns('todo')}
+    if 'version' not in columns:
+        db.engine.execute(text("ALTER TABLE todo ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    if 'batch' not in columns:
+        db.engine.execute(text("ALTER TABLE todo ADD COLUMN batch VARCHAR(32)"))
+    existing = {index['name'] for index in inspect(db.engine).get_indexes('todo')}
+    for index in Todo.__table__.indexes:
+        if index.name not in existing:
+            index.create(bind=db.engine)
+    fts_enabled = init_fts()
+
+def init_db(attempts=3):
+    for attempt in range(attempts):
+        try:
+            create_schema()
+            return
+        except (OperationalError, IntegrityError, sqlite3.OperationalError):
+            # Workers starting together on a fresh database race to create
+            # the same tables; whatever lost is already there on the retry
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.2)
+
+def current_version():
+    return db.session.query(TableVersion.version).filter_by(name='todo').scalar()
+
+def bump_version():
+    """Invalidate cached todo pages; call before committing a write to Todo"""
+    TableVersion.query.filter_by(name='todo').update(
+        {TableVersion.version: TableVersion.version + 1}, synchronize_session=False)
+
+def cached_response(render, mimetype='text/html'):
+    """Serve render() from the cache, keyed on the build, the URL and the todo table version"""
+    key = f"{app.config['BUILD_VERSION']}:{request.full_path}@{current_version()}"
+    etag = hashlib.sha1(key.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        body = cache.get(key)
+        if body is None:
+            body = render()
+            cache.set(key, body)
+        response = make_response(body)
+        response.mimetype = mimetype
+    response.set_etag(etag)
+    # Let browsers keep the page but revalidate it on every visit
+    response.cache_control.no_cache = True
+    return response
+
+def encode_cursor(todo):
+    raw = f"{todo.date_created.isoformat()}|{todo.sno}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created, sno = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created), int(sno)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def clamp_per_page(per_page):
+    per_page = per_page or app.config['TODOS_PER_PAGE']
+    return max(1, min(per_page, app.config['TODOS_MAX_PER_PAGE']))
+
+def paginate_todos(after=None, before=None, per_page=None):
+    """Return one page of todos plus cursors for the pages either side of it"""
+    per_page = clamp_per_page(per_page)
+    key = tuple_(Todo.date_created, Todo.sno)
+    query = Todo.query
+
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+    if before:
+        query = query.filter(key < before).order_by(Todo.date_created.desc(), Todo.sno.desc())
+    else:
+        if after:
+            query = query.filter(key > after)
+        query = query.order_by(Todo.date_created, Todo.sno)
+
+    # Fetch one extra row to find out whether another page follows
+    todos = query.limit(per_page + 1).all()
+    has_more = len(todos) > per_page
+    todos = todos[:per_page]
+    if before:
+        todos.reverse()
+
+    next_cursor = prev_cursor = None
+    if todos:
+        if has_more or before:
+            next_cursor = encode_cursor(todos[-1])
+        if after or (before and has_more):
+            prev_cursor = encode_cursor(todos[0])
+    return todos, next_cursor, prev_cursor
+
+def page_starting_at(todo):
+    """URL of the page whose first row is `todo`"""
+    key = tuple_(Todo.date_created, Todo.sno)
+    previous = db.session.query(Todo.date_created, Todo.sno) \
+        .filter(key < (todo.date_created, todo.sno)) \
+        .order_by(Todo.date_created.desc(), Todo.sno.desc()).first()
+    if previous is None:
+        return url_for('hello_world')
+    return url_for('hello_world', after=encode_cursor(previous))
+
+def wants_fragment():
+    # todos.js sends this header when it only needs the affected row back
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
 @app.route('/', methods=['GET', 'POST'])
 def hello_world():
     if request.method=='POST':
@@ -23,10 +297,179 @@ def hello_world():
         desc = request.form['desc']
         todo = Todo(title=title, desc=desc)
         db.session.add(todo)
+        bump_version()
         db.session.commit()
+        if wants_fragment():
+            response = make_response(render_template('_todo_row.html', todo=todo), 201)
+            # The row only belongs on the final page; todos.js goes here otherwise
+            response.headers['X-Todo-Page'] = page_starting_at(todo)
+            return response
+        return redirect(url_for('hello_world'), code=303)
         
-    allTodo = Todo.query.all() 
-    return render_template('index.html', allTodo=allTodo)
+    def render():
+        per_page = clamp_per_page(request.args.get('per_page', type=int))
+        allTodo, next_cursor, prev_cursor = paginate_todos(
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=per_page,
+        )
+        return render_template('index.html', allTodo=allTodo, per_page=per_page,
+                               next_cursor=next_cursor, prev_cursor=prev_cursor)
+    return cached_response(render)
+
+FTS_SEARCH = """SELECT todo.* FROM todo_fts JOIN todo ON todo.sno = todo_fts.rowid
+                WHERE todo_fts MATCH :match ORDER BY todo_fts.rank
+                LIMIT :limit OFFSET :offset"""
+
+def fts_match(terms):
+    # Quote every term so user input can't inject FTS syntax, and
+    # prefix-match so partial words still find something
+    return ' '.join('"{}"*'.format(term) for term in terms)
+
+def search_todos(query, page=1, per_page=None):
+    """Return the best matching todos for one page of results and whether more follow"""
+    per_page = clamp_per_page(per_page)
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return [], False
+    offset = (max(page, 1) - 1) * per_page
+
+    if fts_enabled:
+        todos = Todo.query.from_statement(text(FTS_SEARCH)).params(
+            match=fts_match(terms), limit=per_page + 1, offset=offset).all()
+    else:
+        conditions = [or_(Todo.title.ilike(f'%{term}%'), Todo.desc.ilike(f'%{term}%'))
+                      for term in terms]
+        todos = Todo.query.filter(and_(*conditions)).order_by(Todo.sno.desc()) \
+            .limit(per_page + 1).offset(offset).all()
+    return todos[:per_page], len(todos) > per_page
+
+def todo_to_dict(todo):
+    return {
+        'sno': todo.sno,
+        'title': todo.title,
+        'desc': todo.desc,
+        'date_created': todo.date_created.isoformat() if todo.date_created else None,
+        'version': todo.version,
+    }
+
+def chunked(items, size=500):
+    # Keep IN (...) lists under SQLite's bound-parameter limit
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def fetch_todos(snos):
+    todos = []
+    for chunk in chunked(snos):
+        todos.extend(Todo.query.filter(Todo.sno.in_(chunk)).order_by(Todo.sno).all())
+    return todos
+
+def is_sno(value):
+    # JSON true/false arrive as bool, which is a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def validate_batch(payload):
+    """Check a bulk request body and return (creates, updates, deletes) or an error string"""
+    if not isinstance(payload, dict):
+        return "Request body must be a JSON object"
+    creates = payload.get('create', [])
+    updates = payload.get('update', [])
+    deletes = payload.get('delete', [])
+    if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+        return "'create', 'update' and 'delete' must be lists"
+    if len(creates) + len(updates) + len(deletes) > app.config['API_MAX_BATCH']:
+        return f"At most {app.config['API_MAX_BATCH']} operations per request"
+
+    for item in creates:
+        if not isinstance(item, dict) or not isinstance(item.get('title'), str) \
+                or not isinstance(item.get('desc'), str):
+            return "Each create needs a 'title' and a 'desc' string"
+    for item in updates:
+        if not isinstance(item, dict) or not is_sno(item.get('sno')):
+            return "Each update needs an integer 'sno'"
+        fields = set(item) - {'sno'}
+        if not fields or not fields <= {'title', 'desc'} \
+                or not all(isinstance(item[field], str) for field in fields):
+            return "Each update must set 'title' and/or 'desc' strings"
+    if not all(is_sno(sno) for sno in deletes):
+        return "'delete' must be a list of integer snos"
+    return creates, updates, deletes
+
+@app.route('/api/todos', methods=['GET'])
+def api_list_todos():
+    def render():
+        todos, next_cursor, prev_cursor = paginate_todos(
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=request.args.get('per_page', type=int),
+        )
+        return json.dumps({'todos': [todo_to_dict(todo) for todo in todos],
+                           'next': next_cursor, 'prev': prev_cursor})
+    return cached_response(render, mimetype='application/json')
+
+@app.route('/api/todos', methods=['POST'])
+def api_bulk_todos():
+    """Apply a batch of creates, updates and deletes in a single transaction"""
+    batch = validate_batch(request.get_json(silent=True))
+    if isinstance(batch, str):
+        return jsonify(error=batch), 400
+    creates, updates, deletes = batch
+    table = Todo.__table__
+
+    created = []
+    if creates:
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        rows = [{'title': item['title'], 'desc': item['desc'], 'date_created': now, 'batch': token}
+                for item in creates]
+        # A single executemany. SQLAlchemy 1.3 can't return the new snos from
+        # it, so read the rows back by their batch token, which no other
+        # request shares whatever the backend or number of writers
+        db.session.execute(table.insert(), rows)
+        created = db.session.execute(
+            table.select().where(table.c.batch == token).order_by(table.c.sno)).fetchall()
+
+    updated = []
+    if updates:
+        # One executemany per distinct set of columns being changed
+        groups = {}
+        for item in updates:
+            fields = tuple(sorted(set(item) - {'sno'}))
+            params = {field: item[field] for field in fields}
+            params['_sno'] = item['sno']
+            groups.setdefault(fields, []).append(params)
+        statement = table.update().where(table.c.sno == bindparam('_sno')) \
+            .values(version=table.c.version + 1)
+        for params in groups.values():
+            db.session.execute(statement, params)
+        updated = sorted({item['sno'] for item in updates})
+
+    deleted = []
+    if deletes:
+        snos = sorted(set(deletes))
+        for chunk in chunked(snos):
+            deleted.extend(sno for sno, in db.session.query(Todo.sno).filter(Todo.sno.in_(chunk)))
+            db.session.execute(table.delete().where(table.c.sno.in_(chunk)))
+
+    if created or updated or deleted:
+        bump_version()
+    db.session.commit()
+    return jsonify(
+        created=[todo_to_dict(todo) for todo in created],
+        updated=[todo_to_dict(todo) for todo in fetch_todos(updated)],
+        deleted=deleted,
+    )
+
+@app.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+
+    def render():
+        todos, has_more = search_todos(query, page, request.args.get('per_page', type=int))
+        return render_template('search.html', query=query, todos=todos,
+                               page=page, has_more=has_more)
+    return cached_response(render)
 
 @app.route('/show')
 def products():
@@ -34,27 +477,54 @@ def products():
     print(allTodo)
     return 'this is products page'
 
+def missing_or_conflict(sno):
+    """Explain why a versioned write to `sno` matched no row"""
+    if db.session.query(Todo.sno).filter_by(sno=sno).scalar() is None:
+        abort(404)
+    return Todo.query.get(sno)
+
 @app.route('/update/<int:sno>', methods=['GET', 'POST'])
 def update(sno):
     if request.method=='POST':
         title = request.form['title']
         desc = request.form['desc']
-        todo = Todo.query.filter_by(sno=sno).first()
-        todo.title = title
-        todo.desc = desc
-        db.session.add(todo)
+        version = request.form.get('version', type=int)
+        table = Todo.__table__
+        statement = table.update().where(table.c.sno == sno) \
+            .values(title=title, desc=desc, version=table.c.version + 1)
+        if version is not None:
+            statement = statement.where(table.c.version == version)
+        if db.session.execute(statement).rowcount == 0:
+            current = missing_or_conflict(sno)
+            return render_template('update.html', todo=current, conflict=True), 409
+        bump_version()
         db.session.commit()
-        return redirect("/")
+        if wants_fragment():
+            return render_template('_todo_row.html', todo=Todo.query.get(sno))
+        return redirect("/", code=303)
         
-    todo = Todo.query.filter_by(sno=sno).first()
+    todo = Todo.query.get_or_404(sno)
     return render_template('update.html', todo=todo)
 
 @app.route('/delete/<int:sno>')
 def delete(sno):
-    todo = Todo.query.filter_by(sno=sno).first()
-    db.session.delete(todo)
+    version = request.args.get('version', type=int)
+    table = Todo.__table__
+    statement = table.delete().where(table.c.sno == sno)
+    if version is not None:
+        statement = statement.where(table.c.version == version)
+    if db.session.execute(statement).rowcount == 0:
+        missing_or_conflict(sno)
+        abort(409)
+    bump_version()
     db.session.commit()
+    if wants_fragment():
+        return '', 204
     return redirect("/")
 
+with app.app_context():
+    init_db()
+    init_metrics(app, db.engine)
+
 if __name__ == "__main__":
-    app.run(debug=True, port=8000)
\ No newline at end of file
+    app.run(debug=True, port=8000)
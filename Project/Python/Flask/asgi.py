@@ -0,0 +1,384 @@
+"""ASGI version of the todo app.
+
+Serves the same routes and templates as app.py, but with async views and
+aiosqlite so a worker keeps handling other connections while one waits on
+SQLite. The schema, config and cache are shared with app.py, which is
+imported (and so creates/migrates the database) first.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --workers 4
+"""
+import asyncio
+import hashlib
+import json
+import re
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from time import perf_counter
+from types import SimpleNamespace
+
+import aiosqlite
+from quart import Quart, Response, g, render_template, request, redirect, jsonify, url_for, make_response, abort
+
+import app as wsgi
+from metrics import Histogram
+
+if wsgi.db.engine.dialect.name != 'sqlite':
+    raise RuntimeError("The ASGI app only supports SQLite databases")
+
+app = Quart(__name__)
+config = wsgi.app.config
+cache = wsgi.cache
+
+class ConnectionPool:
+    """Fixed set of aiosqlite connections shared by the requests of one worker"""
+
+    def __init__(self, path, size, pragmas):
+        self.path = path
+        self.size = size
+        self.pragmas = pragmas
+        self._idle = asyncio.Queue()
+
+    async def open(self):
+        for _ in range(self.size):
+            connection = await aiosqlite.connect(self.path)
+            connection.row_factory = aiosqlite.Row
+            for name, value in self.pragmas.items():
+                await connection.execute(f"PRAGMA {name}={value}")
+            self._idle.put_nowait(connection)
+
+    async def close(self):
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+
+    @asynccontextmanager
+    async def connection(self):
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            # Never hand the next request a half-finished transaction
+            if connection.in_transaction:
+                await connection.rollback()
+            self._idle.put_nowait(connection)
+
+pool = ConnectionPool(wsgi.db.engine.url.database, config['DB_POOL_SIZE'], config['SQLITE_PRAGMAS'])
+
+@app.before_serving
+async def open_pool():
+    await pool.open()
+
+@app.after_serving
+async def close_pool():
+    await pool.close()
+
+def sqlite_datetime(value):
+    # The text format SQLAlchemy stores DateTime columns in, so comparisons
+    # against rows written by app.py sort correctly
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def todo_from_row(row):
+    todo = SimpleNamespace(**dict(zip(row.keys(), row)))
+    if todo.date_created:
+        todo.date_created = datetime.fromisoformat(todo.date_created)
+    return todo
+
+async def fetch_all(connection, sql, params=()):
+    async with connection.execute(sql, params) as cursor:
+        return [todo_from_row(row) for row in await cursor.fetchall()]
+
+async def current_version(connection):
+    async with connection.execute("SELECT version FROM table_version WHERE name = 'todo'") as cursor:
+        return (await cursor.fetchone())[0]
+
+async def bump_version(connection):
+    await connection.execute("UPDATE table_version SET version = version + 1 WHERE name = 'todo'")
+
+async def cached_response(render, mimetype='text/html'):
+    """Async twin of app.cached_response; render() gets a pooled connection"""
+    async with pool.connection() as connection:
+        key = f"{config['BUILD_VERSION']}:{request.full_path}@{await current_version(connection)}"
+        etag = hashlib.sha1(key.encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = await make_response('', 304)
+        else:
+            body = cache.get(key)
+            if body is None:
+                body = await render(connection)
+                cache.set(key, body)
+            response = await make_response(body)
+            response.mimetype = mimetype
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+async def paginate_todos(connection, after=None, before=None, per_page=None):
+    per_page = wsgi.clamp_per_page(per_page)
+    after = wsgi.decode_cursor(after) if after else None
+    before = wsgi.decode_cursor(before) if before else None
+
+    if before:
+        where, order = "WHERE (date_created, sno) < (?, ?)", "DESC"
+    elif after:
+        where, order = "WHERE (date_created, sno) > (?, ?)", "ASC"
+    else:
+        where, order = "", "ASC"
+    cursor = before or after
+    params = (sqlite_datetime(cursor[0]), cursor[1]) if cursor else ()
+    todos = await fetch_all(
+        connection,
+        f"SELECT * FROM todo {where} ORDER BY date_created {order}, sno {order} LIMIT ?",
+        params + (per_page + 1,))
+
+    has_more = len(todos) > per_page
+    todos = todos[:per_page]
+    if before:
+        todos.reverse()
+
+    next_cursor = prev_cursor = None
+    if todos:
+        if has_more or before:
+            next_cursor = wsgi.encode_cursor(todos[-1])
+        if after or (before and has_more):
+            prev_cursor = wsgi.encode_cursor(todos[0])
+    return todos, next_cursor, prev_cursor
+
+async def page_starting_at(connection, todo):
+    """Async twin of app.page_starting_at"""
+    previous = await fetch_all(
+        connection,
+        "SELECT date_created, sno FROM todo WHERE (date_created, sno) < (?, ?) "
+        "ORDER BY date_created DESC, sno DESC LIMIT 1",
+        (sqlite_datetime(todo.date_created), todo.sno))
+    if not previous:
+        return url_for('hello_world')
+    return url_for('hello_world', after=wsgi.encode_cursor(previous[0]))
+
+async def search_todos(connection, query, page=1, per_page=None):
+    per_page = wsgi.clamp_per_page(per_page)
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return [], False
+    offset = (max(page, 1) - 1) * per_page
+
+    if wsgi.fts_enabled:
+        todos = await fetch_all(connection, wsgi.FTS_SEARCH, {
+            'match': wsgi.fts_match(terms), 'limit': per_page + 1, 'offset': offset})
+    else:
+        where = ' AND '.join('(title LIKE ? OR "desc" LIKE ?)' for _ in terms)
+        params = [f'%{term}%' for term in terms for _ in range(2)]
+        todos = await fetch_all(
+            connection, f"SELECT * FROM todo WHERE {where} ORDER BY sno DESC LIMIT ? OFFSET ?",
+            params + [per_page + 1, offset])
+    return todos[:per_page], len(todos) > per_page
+
+async def fetch_todos(connection, snos):
+    todos = []
+    for chunk in wsgi.chunked(snos):
+        placeholders = ', '.join('?' * len(chunk))
+        todos.extend(await fetch_all(
+            connection, f"SELECT * FROM todo WHERE sno IN ({placeholders}) ORDER BY sno", chunk))
+    return todos
+
+def wants_fragment():
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+INSERT_TODO = 'INSERT INTO todo (title, "desc", date_created, version) VALUES (?, ?, ?, 1)'
+INSERT_BATCH = 'INSERT INTO todo (title, "desc", date_created, version, batch) VALUES (?, ?, ?, 1, ?)'
+
+@app.route('/', methods=['GET', 'POST'])
+async def hello_world():
+    if request.method == 'POST':
+        form = await request.form
+        now = datetime.utcnow()
+        async with pool.connection() as connection:
+            cursor = await connection.execute(INSERT_TODO, (form['title'], form['desc'], sqlite_datetime(now)))
+            await bump_version(connection)
+            await connection.commit()
+            if wants_fragment():
+                todo = SimpleNamespace(sno=cursor.lastrowid, title=form['title'], desc=form['desc'],
+                                       date_created=now, version=1)
+                page = await page_starting_at(connection, todo)
+        if wants_fragment():
+            response = await make_response(await render_template('_todo_row.html', todo=todo), 201)
+            response.headers['X-Todo-Page'] = page
+            return response
+        return redirect(url_for('hello_world'), code=303)
+
+    async def render(connection):
+        per_page = wsgi.clamp_per_page(request.args.get('per_page', type=int))
+        allTodo, next_cursor, prev_cursor = await paginate_todos(
+            connection,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=per_page,
+        )
+        return await render_template('index.html', allTodo=allTodo, per_page=per_page,
+                                     next_cursor=next_cursor, prev_cursor=prev_cursor)
+    return await cached_response(render)
+
+@app.route('/search')
+async def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+
+    async def render(connection):
+        todos, has_more = await search_todos(connection, query, page, request.args.get('per_page', type=int))
+        return await render_template('search.html', query=query, todos=todos,
+                                     page=page, has_more=has_more)
+    return await cached_response(render)
+
+@app.route('/api/todos', methods=['GET'])
+async def api_list_todos():
+    async def render(connection):
+        todos, next_cursor, prev_cursor = await paginate_todos(
+            connection,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=request.args.get('per_page', type=int),
+        )
+        return json.dumps({'todos': [wsgi.todo_to_dict(todo) for todo in todos],
+                           'next': next_cursor, 'prev': prev_cursor})
+    return await cached_response(render, mimetype='application/json')
+
+@app.route('/api/todos', methods=['POST'])
+async def api_bulk_todos():
+    batch = wsgi.validate_batch(await request.get_json(silent=True))
+    if isinstance(batch, str):
+        return jsonify(error=batch), 400
+    creates, updates, deletes = batch
+
+    async with pool.connection() as connection:
+        created = []
+        if creates:
+            # One executemany, read back by its batch token as in app.py
+            now = sqlite_datetime(datetime.utcnow())
+            token = uuid.uuid4().hex
+            await connection.executemany(
+                INSERT_BATCH, [(item['title'], item['desc'], now, token) for item in creates])
+            created = await fetch_all(
+                connection, "SELECT * FROM todo WHERE batch = ? ORDER BY sno", (token,))
+
+        groups = {}
+        for item in updates:
+            fields = tuple(sorted(set(item) - {'sno'}))
+            params = {field: item[field] for field in fields}
+            params['_sno'] = item['sno']
+            groups.setdefault(fields, []).append(params)
+        for fields, params in groups.items():
+            assignments = ', '.join(f'"{field}" = :{field}' for field in fields)
+            await connection.executemany(
+                f"UPDATE todo SET {assignments}, version = version + 1 WHERE sno = :_sno", params)
+        updated = sorted({item['sno'] for item in updates})
+
+        deleted = []
+        for chunk in wsgi.chunked(sorted(set(deletes))):
+            placeholders = ', '.join('?' * len(chunk))
+            async with connection.execute(f"SELECT sno FROM todo WHERE sno IN ({placeholders})", chunk) as cursor:
+                deleted.extend(row[0] for row in await cursor.fetchall())
+            await connection.execute(f"DELETE FROM todo WHERE sno IN ({placeholders})", chunk)
+
+        if created or updated or deleted:
+            await bump_version(connection)
+        await connection.commit()
+        updated = await fetch_todos(connection, updated)
+
+    return jsonify(
+        created=[wsgi.todo_to_dict(todo) for todo in created],
+        updated=[wsgi.todo_to_dict(todo) for todo in updated],
+        deleted=deleted,
+    )
+
+@app.route('/show')
+async def products():
+    async with pool.connection() as connection:
+        allTodo = await fetch_all(connection, "SELECT * FROM todo")
+    print([f"{todo.sno} - {todo.title}" for todo in allTodo])
+    return 'this is products page'
+
+async def get_or_404(connection, sno):
+    todos = await fetch_all(connection, "SELECT * FROM todo WHERE sno = ?", (sno,))
+    if not todos:
+        abort(404)
+    return todos[0]
+
+@app.route('/update/<int:sno>', methods=['GET', 'POST'])
+async def update(sno):
+    async with pool.connection() as connection:
+        if request.method == 'POST':
+            form = await request.form
+            version = form.get('version', type=int)
+            sql = 'UPDATE todo SET title = ?, "desc" = ?, version = version + 1 WHERE sno = ?'
+            params = [form['title'], form['desc'], sno]
+            if version is not None:
+                sql += ' AND version = ?'
+                params.append(version)
+            cursor = await connection.execute(sql, params)
+            if cursor.rowcount == 0:
+                current = await get_or_404(connection, sno)
+                return await render_template('update.html', todo=current, conflict=True), 409
+            await bump_version(connection)
+            await connection.commit()
+            if wants_fragment():
+                todo = await get_or_404(connection, sno)
+                return await render_template('_todo_row.html', todo=todo)
+            return redirect("/", code=303)
+
+        todo = await get_or_404(connection, sno)
+    return await render_template('update.html', todo=todo)
+
+@app.route('/delete/<int:sno>')
+async def delete(sno):
+    version = request.args.get('version', type=int)
+    sql, params = 'DELETE FROM todo WHERE sno = ?', [sno]
+    if version is not None:
+        sql += ' AND version = ?'
+        params.append(version)
+    async with pool.connection() as connection:
+        cursor = await connection.execute(sql, params)
+        if cursor.rowcount == 0:
+            await get_or_404(connection, sno)
+            abort(409)
+        await bump_version(connection)
+        await connection.commit()
+    if wants_fragment():
+        return '', 204
+    return redirect("/")
+
+class RequestMetrics:
+    """Request timings at /metrics, named as in metrics.Metrics
+
+    aiosqlite has no statement hooks, so the per-request SQL and template
+    breakdown is only available from app.py.
+    """
+
+    def __init__(self, app):
+        self.request_duration = Histogram(
+            'todo_request_duration_seconds', "Total time spent handling a request",
+            ('endpoint', 'method'))
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.expose)
+
+    async def start_request(self):
+        g.metrics_start = perf_counter()
+
+    async def finish_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        total = perf_counter() - start
+        self.request_duration.observe(total, request.endpoint or 'unknown', request.method)
+        response.headers['Server-Timing'] = f"total;dur={total * 1000:.2f}"
+        return response
+
+    async def expose(self):
+        return Response('\n'.join(self.request_duration.expose()) + '\n',
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+if config.get('METRICS_ENABLED'):
+    RequestMetrics(app)
+
+if __name__ == "__main__":
+    app.run(debug=True, port=8000)
@@ -0,0 +1,356 @@
+"""Load benchmarks for the todo app.
+
+Every run works on a scratch database that can be seeded with generated
+todos first, replays a weighted mix of requests and reports latency
+percentiles and throughput:
+
+    # fill a database with generated todos
+    python bench.py seed --database bench.db --rows 100000
+
+    # mixed read/search/create/update/delete workload, in-process or live
+    python bench.py load --target testclient --rows 10000 --requests 5000
+    python bench.py load --target gunicorn --rows 1000000 --workers 4 --duration 30
+
+    # gunicorn across worker counts and SQLite journal modes
+    python bench.py gunicorn --workers 1,2,4,8 --journal-modes wal,delete
+
+    # sync gunicorn (app.py) against uvicorn (asgi.py) as clients pile up
+    python bench.py asgi --workers 4 --concurrency 8,32,128
+
+`load` exits with status 1 when --max-p95 is given and exceeded, so it can
+guard against regressions in CI.
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORDS = ['buy', 'milk', 'call', 'email', 'report', 'fix', 'bug', 'review', 'meeting',
+         'plan', 'gym', 'book', 'pay', 'rent', 'clean', 'garage', 'read', 'parts']
+DEFAULT_MIX = 'read=70,search=10,create=10,update=7,delete=3'
+OPS = ('read', 'search', 'create', 'update', 'delete')
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def seed(database, rows, chunk=10000):
+    """Add `rows` generated todos to `database`, creating the app's schema first"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.abspath(database)}"
+    sys.path.insert(0, HERE)
+    import app as todo_app
+
+    table = todo_app.Todo.__table__
+    rng = random.Random(rows)
+    start = datetime(2020, 1, 1)
+    with todo_app.db.engine.begin() as connection:
+        for offset in range(0, rows, chunk):
+            connection.execute(table.insert(), [
+                {'title': random_text(rng, 3), 'desc': random_text(rng, 8),
+                 'date_created': start + timedelta(seconds=offset + i), 'version': 1}
+                for i in range(min(chunk, rows - offset))
+            ])
+        connection.execute("UPDATE table_version SET version = version + 1 WHERE name = 'todo'")
+    return todo_app
+
+def live_snos(database):
+    with contextlib.closing(sqlite3.connect(database)) as connection:
+        return [sno for sno, in connection.execute("SELECT sno FROM todo")]
+
+def parse_mix(text):
+    mix = []
+    for part in text.split(','):
+        op, weight = part.split('=')
+        if op not in OPS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {op!r}; choose from {', '.join(OPS)}")
+        mix.append((op, float(weight)))
+    return mix
+
+class Workload:
+    """Picks the requests of a weighted mix, remembering which snos still exist"""
+
+    def __init__(self, mix, snos, seed=None):
+        self.ops, self.weights = zip(*mix)
+        self.snos = list(snos)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def pick_sno(self, remove=False):
+        with self.lock:
+            if not self.snos:
+                return None
+            i = self.rng.randrange(len(self.snos))
+            sno = self.snos[i]
+            if remove:
+                # Swap with the last element so removal stays O(1)
+                self.snos[i] = self.snos[-1]
+                self.snos.pop()
+            return sno
+
+    def next_request(self):
+        """Return (op, method, path, form data) for the next request"""
+        with self.lock:
+            op = self.rng.choices(self.ops, self.weights)[0]
+            form = {'title': random_text(self.rng, 3), 'desc': random_text(self.rng, 8)}
+            word = self.rng.choice(WORDS)
+        if op in ('update', 'delete'):
+            sno = self.pick_sno(remove=op == 'delete')
+            if sno is None:
+                op = 'create'
+            elif op == 'update':
+                return op, 'POST', f'/update/{sno}', form
+            else:
+                return op, 'GET', f'/delete/{sno}', None
+        if op == 'create':
+            return op, 'POST', '/', form
+        if op == 'search':
+            return op, 'GET', f'/search?q={word}', None
+        return op, 'GET', '/', None
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, op, seconds, ok):
+        if ok:
+            self.latencies[op].append(seconds)
+        else:
+            self.errors[op] += 1
+
+    def merge(self, other):
+        for op, values in other.latencies.items():
+            self.latencies[op].extend(values)
+        for op, count in other.errors.items():
+            self.errors[op] += count
+
+    def all_latencies(self):
+        return [value for values in self.latencies.values() for value in values]
+
+    def total_ok(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    def total_errors(self):
+        return sum(self.errors.values())
+
+def percentiles(values):
+    """p50, p95 and p99 of `values` in milliseconds"""
+    if not values:
+        return 0.0, 0.0, 0.0
+    if len(values) == 1:
+        return (values[0] * 1000,) * 3
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+def report(recorder, elapsed):
+    print(f"{'op':>8} {'count':>8} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = [(op, recorder.latencies[op], recorder.errors[op]) for op in OPS
+            if recorder.latencies[op] or recorder.errors[op]]
+    rows.append(('all', recorder.all_latencies(), recorder.total_errors()))
+    for op, values, errors in rows:
+        p50, p95, p99 = percentiles(values)
+        print(f"{op:>8} {len(values):>8} {errors:>8} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}")
+    print(f"{recorder.total_ok() / elapsed:.1f} req/s over {elapsed:.1f}s")
+
+def run_testclient(client, workload, requests):
+    """Replay `requests` requests through the Flask test client, one at a time"""
+    recorder = Recorder()
+    headers = {'X-Requested-With': 'XMLHttpRequest'}
+    started = time.perf_counter()
+    for _ in range(requests):
+        op, method, path, form = workload.next_request()
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=form, headers=headers)
+        recorder.record(op, time.perf_counter() - start, response.status_code < 400)
+    return recorder, time.perf_counter() - started
+
+def run_http(base_url, workload, duration, concurrency):
+    """Hit a live server from `concurrency` threads for `duration` seconds"""
+    recorder = Recorder()
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client():
+        local = Recorder()
+        while time.time() < deadline:
+            op, method, path, form = workload.next_request()
+            body = urllib.parse.urlencode(form).encode() if form else None
+            # Ask for row fragments so writes aren't followed by a redirect
+            request = urllib.request.Request(base_url + path, data=body, method=method,
+                                             headers={'X-Requested-With': 'XMLHttpRequest'})
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(request, timeout=30).read()
+                ok = True
+            except OSError:
+                ok = False
+            local.record(op, time.perf_counter() - start, ok)
+        with lock:
+            recorder.merge(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(base_url, process, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+def start_server(kind, workers, env, port):
+    if kind == 'wsgi':
+        # gunicorn 20.0 has no __main__ module, so call its entry point directly
+        command = [sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()', 'app:app',
+                   '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+                   '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app',
+                   '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port),
+                   '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=HERE, env=env)
+
+@contextlib.contextmanager
+def scratch_database():
+    scratch = tempfile.mkdtemp(prefix='todo-bench-')
+    try:
+        yield os.path.join(scratch, 'bench.db')
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+@contextlib.contextmanager
+def running_server(kind, workers, rows=0, **env):
+    """Run the 'wsgi' or 'asgi' app on a scratch database and yield (base URL, database)"""
+    with scratch_database() as database:
+        if rows:
+            # Seed from a separate process so this one never binds to the database
+            subprocess.run([sys.executable, __file__, 'seed', '--database', database,
+                            '--rows', str(rows)], cwd=HERE, check=True)
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", **env)
+        port = free_port()
+        server = start_server(kind, workers, env, port)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_for_server(base_url, server)
+            yield base_url, database
+        finally:
+            server.terminate()
+            server.wait()
+
+def bench_seed(args):
+    started = time.perf_counter()
+    seed(args.database, args.rows)
+    print(f"Seeded {args.rows} todos into {args.database} in {time.perf_counter() - started:.1f}s")
+
+def bench_load(args):
+    if args.target == 'testclient':
+        with scratch_database() as database:
+            todo_app = seed(database, args.rows)
+            workload = Workload(args.mix, live_snos(database), seed=args.seed)
+            recorder, elapsed = run_testclient(todo_app.app.test_client(), workload, args.requests)
+    else:
+        with running_server('wsgi', args.workers, rows=args.rows) as (base_url, database):
+            workload = Workload(args.mix, live_snos(database), seed=args.seed)
+            recorder, elapsed = run_http(base_url, workload, args.duration, args.concurrency)
+    report(recorder, elapsed)
+
+    p95 = percentiles(recorder.all_latencies())[1]
+    if args.max_p95 is not None and p95 > args.max_p95:
+        print(f"FAIL: p95 {p95:.2f} ms is above the {args.max_p95:.2f} ms budget")
+        sys.exit(1)
+
+def write_mix(write_ratio):
+    return [('read', 1 - write_ratio), ('create', write_ratio)]
+
+def bench_gunicorn(args):
+    print(f"{'workers':>8} {'journal':>8} {'req/s':>10} {'errors':>8} {'p95 ms':>9} {'p99 ms':>9}")
+    for journal_mode in args.journal_modes.split(','):
+        for workers in (int(count) for count in args.workers.split(',')):
+            with running_server('wsgi', workers, SQLITE_JOURNAL_MODE=journal_mode) as (base_url, _):
+                workload = Workload(write_mix(args.write_ratio), [])
+                recorder, elapsed = run_http(base_url, workload, args.duration, args.concurrency)
+            _, p95, p99 = percentiles(recorder.all_latencies())
+            print(f"{workers:>8} {journal_mode:>8} {recorder.total_ok() / elapsed:>10.1f} "
+                  f"{recorder.total_errors():>8} {p95:>9.2f} {p99:>9.2f}")
+
+def bench_asgi(args):
+    print(f"{'clients':>8} {'server':>8} {'req/s':>10} {'errors':>8} {'p95 ms':>9} {'p99 ms':>9}")
+    for concurrency in (int(count) for count in args.concurrency.split(',')):
+        for kind in ('wsgi', 'asgi'):
+            with running_server(kind, args.workers) as (base_url, _):
+                workload = Workload(write_mix(args.write_ratio), [])
+                recorder, elapsed = run_http(base_url, workload, args.duration, concurrency)
+            _, p95, p99 = percentiles(recorder.all_latencies())
+            print(f"{concurrency:>8} {kind:>8} {recorder.total_ok() / elapsed:>10.1f} "
+                  f"{recorder.total_errors():>8} {p95:>9.2f} {p99:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_command = commands.add_parser('seed', help="fill a database with generated todos")
+    seed_command.add_argument('--database', default='bench.db', help="SQLite file to seed")
+    seed_command.add_argument('--rows', type=int, default=10000, help="todos to add")
+    seed_command.set_defaults(func=bench_seed)
+
+    load = commands.add_parser('load', help="mixed workload with latency percentiles")
+    load.add_argument('--target', choices=('testclient', 'gunicorn'), default='testclient')
+    load.add_argument('--rows', type=int, default=10000, help="todos to seed before the run")
+    load.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                      help=f"weighted operations (default {DEFAULT_MIX})")
+    load.add_argument('--requests', type=int, default=2000, help="requests to send (testclient)")
+    load.add_argument('--duration', type=float, default=10, help="seconds to run (gunicorn)")
+    load.add_argument('--concurrency', type=int, default=16, help="client threads (gunicorn)")
+    load.add_argument('--workers', type=int, default=4, help="gunicorn workers (gunicorn)")
+    load.add_argument('--seed', type=int, default=None, help="random seed for a repeatable mix")
+    load.add_argument('--max-p95', type=float, default=None, help="fail if overall p95 exceeds this many ms")
+    load.set_defaults(func=bench_load)
+
+    gunicorn = commands.add_parser('gunicorn', help="throughput across gunicorn worker counts")
+    gunicorn.add_argument('--workers', default='1,2,4,8', help="comma-separated worker counts")
+    gunicorn.add_argument('--journal-modes', default='wal,delete', help="comma-separated SQLite journal modes")
+    gunicorn.add_argument('--duration', type=float, default=10, help="seconds per run")
+    gunicorn.add_argument('--concurrency', type=int, default=16, help="client threads")
+    gunicorn.add_argument('--write-ratio', type=float, default=0.2, help="share of requests that create a todo")
+    gunicorn.set_defaults(func=bench_gunicorn)
+
+    asgi = commands.add_parser('asgi', help="sync gunicorn against the ASGI app under uvicorn")
+    asgi.add_argument('--workers', type=int, default=4, help="worker processes for both servers")
+    asgi.add_argument('--concurrency', default='8,32,128', help="comma-separated client thread counts")
+    asgi.add_argument('--duration', type=float, default=10, help="seconds per run")
+    asgi.add_argument('--write-ratio', type=float, default=0.2, help="share of requests that create a todo")
+    asgi.set_defaults(func=bench_asgi)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
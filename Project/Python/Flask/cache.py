@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+class NullCache:
+    """Cache that never stores anything, used when caching is switched off"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+class SimpleCache:
+    """In-process LRU cache, one per gunicorn worker"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class RedisCache:
+    """Cache shared by every worker through a Redis server"""
+
+    def __init__(self, url, timeout=300, prefix='todo:'):
+        if redis is None:
+            raise RuntimeError("CACHE_TYPE 'redis' needs the redis package installed")
+        self.client = redis.Redis.from_url(url)
+        self.timeout = timeout
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.timeout)
+
+def make_cache(config):
+    cache_type = config.get('CACHE_TYPE', 'simple')
+    if cache_type == 'simple':
+        return SimpleCache(config.get('CACHE_MAX_ENTRIES', 256))
+    if cache_type == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'], config.get('CACHE_TIMEOUT', 300))
+    if cache_type == 'null':
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_TYPE: {cache_type}")
@@ -0,0 +1,11 @@
+# Read automatically by `gunicorn app:app` (see Procfile)
+import multiprocessing
+import os
+
+# SQLite allows one writer at a time, so extra workers mostly help reads
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+
+# Each worker opens its own pool after the fork; never share SQLite
+# connections across processes
+preload_app = False
@@ -0,0 +1,177 @@
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter
+
+from flask import g, has_request_context, request, Response
+from jinja2 import Template
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = defaultdict(float)
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(label_values, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+                labels = format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {series[-2]}")
+        return lines
+
+class TimedTemplate(Template):
+    """Template that adds its render time to the current request's tally"""
+
+    def render(self, *args, **kwargs):
+        if not has_request_context() or 'metrics' not in g:
+            return super().render(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            g.metrics['render_time'] += perf_counter() - start
+
+class Metrics:
+    """Per-process request, SQL and template timings exposed at /metrics"""
+
+    def __init__(self, app, engine):
+        self.logger = app.logger
+        self.slow_query = app.config['METRICS_SLOW_QUERY_MS'] / 1000
+        self.n_plus_one = app.config['METRICS_N_PLUS_ONE']
+
+        self.request_duration = Histogram(
+            'todo_request_duration_seconds', "Total time spent handling a request",
+            ('endpoint', 'method'))
+        self.query_duration = Histogram(
+            'todo_request_query_seconds', "Time spent in SQL per request", ('endpoint',))
+        self.query_count = Histogram(
+            'todo_request_queries', "SQL statements executed per request", ('endpoint',),
+            buckets=COUNT_BUCKETS)
+        self.render_duration = Histogram(
+            'todo_request_render_seconds', "Time spent rendering templates per request",
+            ('endpoint',))
+        self.slow_queries = Counter(
+            'todo_slow_queries_total', "Statements slower than METRICS_SLOW_QUERY_MS",
+            ('endpoint',))
+        self.repeated_queries = Counter(
+            'todo_n_plus_one_total', "Requests that ran one SELECT METRICS_N_PLUS_ONE times or more",
+            ('endpoint',))
+
+        app.jinja_env.template_class = TimedTemplate
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.expose)
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def start_request(self):
+        g.metrics = {'start': perf_counter(), 'queries': 0, 'query_time': 0.0,
+                     'render_time': 0.0, 'statements': defaultdict(int)}
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics' in g:
+            context._metrics_start = perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_metrics_start', None)
+        if start is None:
+            return
+        elapsed = perf_counter() - start
+        tally = g.metrics
+        tally['queries'] += 1
+        tally['query_time'] += elapsed
+        endpoint = request.endpoint or 'unknown'
+
+        if elapsed >= self.slow_query:
+            self.slow_queries.inc(endpoint)
+            self.logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, endpoint, statement)
+
+        # The same SELECT text over and over in one request usually means a
+        # loop loading related rows one at a time
+        if statement.lstrip().upper().startswith('SELECT'):
+            tally['statements'][statement] += 1
+            if tally['statements'][statement] == self.n_plus_one:
+                self.repeated_queries.inc(endpoint)
+                self.logger.warning("Possible N+1 in %s: ran %d times: %s",
+                                    endpoint, self.n_plus_one, statement)
+
+    def finish_request(self, response):
+        tally = g.pop('metrics', None)
+        if tally is None:
+            return response
+        total = perf_counter() - tally['start']
+        endpoint = request.endpoint or 'unknown'
+        self.request_duration.observe(total, endpoint, request.method)
+        self.query_duration.observe(tally['query_time'], endpoint)
+        self.query_count.observe(tally['queries'], endpoint)
+        self.render_duration.observe(tally['render_time'], endpoint)
+        # Shows the same breakdown in the browser's network panel; "app" is
+        # whatever is left over, mostly ORM hydration and view code
+        other = total - tally['query_time'] - tally['render_time']
+        response.headers['Server-Timing'] = (
+            f"db;desc=\"{tally['queries']} queries\";dur={tally['query_time'] * 1000:.2f}, "
+            f"render;dur={tally['render_time'] * 1000:.2f}, "
+            f"app;dur={other * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}")
+        return response
+
+    def expose(self):
+        lines = []
+        for metric in (self.request_duration, self.query_duration, self.query_count,
+                       self.render_duration, self.slow_queries, self.repeated_queries):
+            lines.extend(metric.expose())
+        return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def init_metrics(app, engine):
+    """Instrument the app when METRICS_ENABLED is set; otherwise add nothing at all"""
+    if not app.config.get('METRICS_ENABLED'):
+        return None
+    return Metrics(app, engine)
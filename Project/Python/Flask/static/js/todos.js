@@ -0,0 +1,62 @@
+// Submit todo mutations in the background and patch only the affected row
+document.addEventListener("DOMContentLoaded", function () {
+    const form = document.getElementById("add-todo");
+    const table = document.getElementById("todo-table");
+
+    form.addEventListener("submit", function (event) {
+        if (!table) {
+            return; // First todo: let the form post and reload the page
+        }
+        event.preventDefault();
+        fetch(form.action, {
+            method: "POST",
+            body: new FormData(form),
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+        })
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                const page = response.headers.get("X-Todo-Page");
+                return response.text().then(function (row) {
+                    return { row: row, page: page };
+                });
+            })
+            .then(function (added) {
+                const rows = table.tBodies[0].rows.length;
+                // New todos sort last, so they only belong on a final page with room left
+                if (table.dataset.finalPage === "true" && rows < Number(table.dataset.perPage)) {
+                    table.tBodies[0].insertAdjacentHTML("beforeend", added.row);
+                    form.reset();
+                    return;
+                }
+                const url = new URL(added.page, window.location.href);
+                const perPage = new URLSearchParams(window.location.search).get("per_page");
+                if (perPage) {
+                    url.searchParams.set("per_page", perPage);
+                }
+                window.location = url;
+            })
+            .catch(function () {
+                form.submit();
+            });
+    });
+
+    document.addEventListener("click", function (event) {
+        const link = event.target.closest("a[data-delete]");
+        if (!link) {
+            return;
+        }
+        event.preventDefault();
+        fetch(link.href, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                link.closest("tr").remove();
+            })
+            .catch(function () {
+                window.location = link.href;
+            });
+    });
+});
@@ -0,0 +1,124 @@
+"""Benchmarks for the Tkinter applications.
+
+Drives the real widgets, so it needs a display (or Xvfb):
+
+    # keystroke-to-paint latency of SimpleNotepad's Python highlighting
+    python bench.py highlight --lines 20000 --keys 300
+
+`highlight` exits with status 1 when --max-p95 is given and exceeded, so it
+can guard against regressions in CI.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import tkinter as tk
+
+import notepad
+
+SOURCE_LINES = [
+    '@dataclass',
+    'class Shape{n}(Base):',
+    '    """A shape with {n} sides.',
+    '',
+    '    Lines of a docstring are one long string to the lexer.',
+    '    """',
+    '    sides = {n}',
+    '    scale = 0x{n:x} * 1.5e-3  # hex and float',
+    '',
+    '    def area(self, width, height=None):',
+    "        name = f'shape-{{self.sides}}'",
+    '        if height is None and width > 0:',
+    '            return len(name) * width ** 2',
+    '        return sum(range(int(width))) / max(height, 1)',
+    '',
+]
+
+def python_source(lines):
+    source = []
+    n = 0
+    while len(source) < lines:
+        source.extend(line.format(n=n) for line in SOURCE_LINES)
+        n += 1
+    return "\n".join(source[:lines])
+
+def percentiles(values):
+    """p50, p95 and p99 of `values` in milliseconds"""
+    if not values:
+        return 0.0, 0.0, 0.0
+    if len(values) == 1:
+        return (values[0] * 1000,) * 3
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+def settle(root, app):
+    """Run the event loop until the highlighter is idle and the widget has redrawn"""
+    while app.highlighter.job is not None:
+        root.update()
+    root.update_idletasks()
+
+def timed(root, app, action):
+    started = time.perf_counter()
+    action()
+    settle(root, app)
+    return time.perf_counter() - started
+
+def bench_highlight(args):
+    rng = random.Random(args.seed)
+    root = tk.Tk()
+    app = notepad.SimpleNotepad(root)
+    text = app.text_area
+    root.update()
+
+    started = time.perf_counter()
+    text.insert("1.0", python_source(args.lines))
+    app.file_path = "bench.py"
+    app.update_highlighting()
+    settle(root, app)
+    print(f"Loaded and coloured the first screen of {args.lines} lines "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    latencies = {'type': [], 'quote': [], 'scroll': []}
+    for _ in range(args.keys):
+        # Jump somewhere new now and then; the first paint there has to
+        # run the lexer down from the last line it knew about
+        if rng.random() < 0.1:
+            line = rng.randint(1, args.lines)
+            latencies['scroll'].append(timed(root, app, lambda: text.yview(f"{line}.0")))
+        top = int(text.index("@0,0").split(".")[0])
+        line = top + rng.randint(0, 20)
+        if rng.random() < 0.1:
+            # Opening a triple-quoted string recolours everything below it
+            latencies['quote'].append(timed(root, app, lambda: text.insert(f"{line}.0", '"""')))
+            latencies['quote'].append(timed(root, app, lambda: text.delete(f"{line}.0", f"{line}.3")))
+        else:
+            text.mark_set(tk.INSERT, f"{line}.0 lineend")
+            latencies['type'].append(timed(root, app, lambda: text.insert(tk.INSERT, "x")))
+    root.destroy()
+
+    print(f"{'op':>8} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for op, values in latencies.items():
+        p50, p95, p99 = percentiles(values)
+        print(f"{op:>8} {len(values):>8} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}")
+    p95 = percentiles(latencies['type'])[1]
+    if args.max_p95 is not None and p95 > args.max_p95:
+        print(f"FAIL: typing p95 {p95:.2f} ms is above the {args.max_p95:.2f} ms budget")
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    highlight = commands.add_parser('highlight', help="keystroke-to-paint latency with Python highlighting")
+    highlight.add_argument('--lines', type=int, default=20000, help="lines of generated Python source")
+    highlight.add_argument('--keys', type=int, default=300, help="edits to time")
+    highlight.add_argument('--seed', type=int, default=None, help="random seed for repeatable edits")
+    highlight.add_argument('--max-p95', type=float, default=None, help="fail if typing p95 exceeds this many ms")
+    highlight.set_defaults(func=bench_highlight)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,660 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog, messagebox, font
+import builtins
+import keyword
+import mmap
 import os
+import queue
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from array import array
+from itertools import chain
+from bisect import bisect_left, bisect_right
+
+# Files at least this big open in read-only large-file mode
+LARGE_FILE_SIZE = 16 * 1024 * 1024
+
+# The process umask, read once up front since reading it means setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Characters outside the BMP. Tcl 8.6 stores each one as a surrogate pair, so
+# Tk's line.column indexes count it as two characters where Python counts one
+ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
+def tk_column(line_text, column):
+    """The Tk column of a code point offset into a line"""
+    return column + len(ASTRAL.findall(line_text, 0, column))
+
+def code_point_column(line_text, column):
+    """The code point offset into a line of a Tk column; the inverse of tk_column"""
+    offset = column
+    for count, match in enumerate(ASTRAL.finditer(line_text)):
+        if match.start() + count >= column:
+            break
+        offset -= 1
+    return offset
+
+def tk_length(text):
+    """How many characters Tk counts in a string"""
+    return len(text) + len(ASTRAL.findall(text))
+
+class LargeFile:
+    """Read-only access to a big file through mmap.
+    
+    A background thread records the byte offset where each line starts, so
+    any range of lines can be decoded without reading the rest of the file.
+    Lines become available while the index is still being built.
+    """
+    CHUNK = 1024 * 1024
+    
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.offsets = array('q', [0])
+        self.indexed = False
+        self.cancelled = False
+        self.thread = threading.Thread(target=self.build_index, daemon=True)
+        self.thread.start()
+    
+    def build_index(self):
+        """Scan the file a chunk at a time, appending the offset after each newline"""
+        position = 0
+        while position < self.size and not self.cancelled:
+            chunk = self.map[position:position + self.CHUNK]
+            offsets = []
+            start = position
+            # The last piece has no newline yet; it continues in the next chunk
+            for line in chunk.split(b"\n")[:-1]:
+                start += len(line) + 1
+                offsets.append(start)
+            self.offsets.extend(offsets)
+            position += len(chunk)
+        self.indexed = True
+    
+    @property
+    def line_count(self):
+        """Lines that can be read so far; the last one is only complete once indexing ends"""
+        return len(self.offsets) if self.indexed else len(self.offsets) - 1
+    
+    def lines(self, first, last):
+        """Text of lines first to last - 1"""
+        start = self.offsets[first]
+        end = self.offsets[last] if last < len(self.offsets) else self.size
+        text = self.map[start:end].decode("utf-8", errors="replace")
+        return text.replace("\r\n", "\n")
+    
+    def close(self):
+        self.cancelled = True
+        self.thread.join()
+        if self.size:
+            self.map.close()
+        self.file.close()
+
+class TextBuffer:
+    """Append-only text that pieces point into, with the offsets of its newlines"""
+    def __init__(self, text=""):
+        self.text = text
+        self.newlines = [match.start() for match in re.finditer("\n", text)]
+    
+    def append(self, text):
+        base = len(self.text)
+        self.newlines.extend(base + match.start() for match in re.finditer("\n", text))
+        self.text += text
+    
+    def count_newlines(self, start, end):
+        return bisect_left(self.newlines, end) - bisect_left(self.newlines, start)
+
+class PieceNode:
+    """Immutable treap node for one piece: buffer.text[start:end].
+    
+    Each node also stores the length and newline count of its whole subtree.
+    Nodes are never changed after creation, so an old root is a complete
+    snapshot of the document.
+    """
+    __slots__ = ("buffer", "start", "end", "priority", "left", "right", "lines", "total_size", "total_lines")
+    
+    def __init__(self, buffer, start, end, priority, left=None, right=None, lines=None):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.lines = buffer.count_newlines(start, end) if lines is None else lines
+        self.total_size = end - start + subtree_size(left) + subtree_size(right)
+        self.total_lines = self.lines + subtree_lines(left) + subtree_lines(right)
+    
+    def with_children(self, left, right):
+        return PieceNode(self.buffer, self.start, self.end, self.priority, left, right, self.lines)
+
+def subtree_size(node):
+    return node.total_size if node is not None else 0
+
+def subtree_lines(node):
+    return node.total_lines if node is not None else 0
+
+def split_pieces(node, offset):
+    """Split a tree into the first `offset` characters and the rest, copying only one path"""
+    if node is None:
+        return None, None
+    left_size = subtree_size(node.left)
+    if offset <= left_size:
+        left, right = split_pieces(node.left, offset)
+        return left, node.with_children(right, node.right)
+    piece_end = left_size + node.end - node.start
+    if offset >= piece_end:
+        left, right = split_pieces(node.right, offset - piece_end)
+        return node.with_children(node.left, left), right
+    
+    # The split falls inside this piece: cut it in two
+    cut = node.start + offset - left_size
+    return (PieceNode(node.buffer, node.start, cut, node.priority, node.left, None),
+            PieceNode(node.buffer, cut, node.end, node.priority, None, node.right))
+
+def merge_pieces(left, right):
+    """Concatenate two trees, copying only the nodes along the seam"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return left.with_children(left.left, merge_pieces(left.right, right))
+    return right.with_children(merge_pieces(left, right.left), right.right)
+
+def extend_last_piece(node, count):
+    """Grow the rightmost piece by `count` characters of its buffer"""
+    if node.right is None:
+        return PieceNode(node.buffer, node.start, node.end + count, node.priority, node.left, None)
+    return node.with_children(node.left, extend_last_piece(node.right, count))
+
+class PieceTable:
+    """The document text as a piece table kept in a persistent treap.
+    
+    Inserts and deletes split and merge the tree in O(log n), copying only
+    the nodes they touch. The original text and everything typed live in
+    append-only buffers that are never rewritten. `root` is an immutable
+    snapshot: saving, searching and undo hold on to old roots instead of
+    copying the text. Offsets count code points and lines are 1-based, like Tk's.
+    """
+    # Typed text goes into shared buffers of up to this size; larger inserts get their own
+    ADD_BUFFER_SIZE = 64 * 1024
+    
+    def __init__(self, text="", root=None):
+        self.add_buffer = TextBuffer()
+        if root is None and text:
+            buffer = TextBuffer(text)
+            root = PieceNode(buffer, 0, len(text), random.random())
+        self.root = root
+    
+    def snapshot(self):
+        """A read-only copy of the current text that later edits do not affect"""
+        return PieceTable(root=self.root)
+    
+    @property
+    def length(self):
+        return subtree_size(self.root)
+    
+    @property
+    def line_count(self):
+        return subtree_lines(self.root) + 1
+    
+    def insert(self, offset, text):
+        if not text:
+            return
+        left, right = split_pieces(self.root, offset)
+        
+        last = left
+        while last is not None and last.right is not None:
+            last = last.right
+        buffer = self.add_buffer
+        if len(text) > self.ADD_BUFFER_SIZE:
+            buffer = TextBuffer(text)
+            piece = PieceNode(buffer, 0, len(text), random.random())
+        else:
+            if len(buffer.text) + len(text) > self.ADD_BUFFER_SIZE:
+                buffer = self.add_buffer = TextBuffer()
+            start = len(buffer.text)
+            # Typing continues the piece it just added to instead of making one per key
+            extends = last is not None and last.buffer is buffer and last.end == start
+            buffer.append(text)
+            if extends:
+                self.root = merge_pieces(extend_last_piece(left, len(text)), right)
+                return
+            piece = PieceNode(buffer, start, start + len(text), random.random())
+        self.root = merge_pieces(merge_pieces(left, piece), right)
+    
+    def delete(self, start, end):
+        if start >= end:
+            return
+        left, right = split_pieces(self.root, end)
+        left, _ = split_pieces(left, start)
+        self.root = merge_pieces(left, right)
+    
+    def line_start(self, line):
+        """Offset of the first character of a line"""
+        newlines = line - 1
+        if newlines <= 0:
+            return 0
+        if newlines > subtree_lines(self.root):
+            return self.length
+        
+        node = self.root
+        offset = 0
+        while True:
+            left_lines = subtree_lines(node.left)
+            if newlines <= left_lines:
+                node = node.left
+                continue
+            newlines -= left_lines
+            offset += subtree_size(node.left)
+            if newlines <= node.lines:
+                positions = node.buffer.newlines
+                position = positions[bisect_left(positions, node.start) + newlines - 1]
+                return offset + position - node.start + 1
+            newlines -= node.lines
+            offset += node.end - node.start
+            node = node.right
+    
+    def line_end(self, line):
+        """Offset just past the last character of a line, before its newline"""
+        if line >= self.line_count:
+            return self.length
+        return self.line_start(line + 1) - 1
+    
+    def chunks(self, start=0, end=None):
+        """The text between two offsets, one piece at a time"""
+        end = self.length if end is None else end
+        stack = []
+        node, base = self.root, 0
+        # In-order walk that skips subtrees outside the range
+        while stack or node is not None:
+            while node is not None:
+                if base >= end or base + node.total_size <= start:
+                    node = None
+                    break
+                stack.append((node, base))
+                node = node.left
+            if not stack:
+                break
+            node, base = stack.pop()
+            piece_base = base + subtree_size(node.left)
+            piece_end = piece_base + node.end - node.start
+            first, last = max(start, piece_base), min(end, piece_end)
+            if first < last:
+                yield node.buffer.text[node.start + first - piece_base:node.start + last - piece_base]
+            node, base = node.right, piece_end
+    
+    def text(self, start=0, end=None):
+        return "".join(self.chunks(start, end))
+
+class FileSaver:
+    """Write a document to disk on a background thread.
+    
+    The data goes to a temporary file in the target's directory, is fsynced,
+    and then renamed over the target, so a crash leaves either the old file
+    or the new one and never a truncated mix. Give it either a PieceTable
+    snapshot to write or the path of a file to copy.
+    """
+    CHUNK = 1024 * 1024
+    
+    def __init__(self, path, document=None, source_path=None):
+        self.path = path
+        self.document = document
+        self.source_path = source_path
+        # Like the text widget, the saved text ends with a newline
+        self.total = document.length + 1 if document is not None else os.path.getsize(source_path)
+        self.written = 0
+        self.error = None
+        self.done = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    @property
+    def progress(self):
+        return self.written * 100 // self.total if self.total else 100
+    
+    def run(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+            if self.document is not None:
+                with os.fdopen(fd, 'w') as file:
+                    for chunk in chain(self.document.chunks(), ["\n"]):
+                        file.write(chunk)
+                        self.written += len(chunk)
+                    file.flush()
+                    os.fsync(file.fileno())
+            else:
+                with os.fdopen(fd, 'wb') as file, open(self.source_path, 'rb') as source:
+                    for chunk in iter(lambda: source.read(self.CHUNK), b""):
+                        file.write(chunk)
+                        self.written += len(chunk)
+                    file.flush()
+                    os.fsync(file.fileno())
+            
+            # mkstemp creates the file owner-only; keep the permissions of the file
+            # being replaced, or give a new file the ones open() would have
+            if os.path.exists(self.path):
+                shutil.copymode(self.path, temp_path)
+            else:
+                os.chmod(temp_path, 0o666 & ~UMASK)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            self.error = e
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+        finally:
+            self.done = True
+
+class SearchWorker:
+    """Run a compiled regex over a PieceTable snapshot on a background thread.
+    
+    Matches are converted to (line, column) Tk positions and handed over in
+    batches through `results`, ending with None, so the UI can highlight
+    them a batch at a time. With `replacement` set it runs one subn()
+    instead and puts a single (new_text, count) result. `surrogates` says
+    whether Tk columns count astral characters twice.
+    """
+    BATCH = 2000
+    
+    def __init__(self, document, pattern, replacement=None, surrogates=False):
+        self.document = document
+        self.text = None
+        self.pattern = pattern
+        self.replacement = replacement
+        self.surrogates = surrogates
+        self.results = queue.Queue()
+        self.cancelled = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        try:
+            # Joining the pieces happens here rather than on the UI thread
+            self.text = self.document.text()
+            if self.replacement is not None:
+                self.results.put(self.pattern.subn(self.replacement, self.text))
+                return
+            self.find_all()
+        except Exception as e:
+            self.results.put(e)
+    
+    def find_all(self):
+        line_starts = [0] + [match.end() for match in re.finditer("\n", self.text)]
+        
+        def position(offset):
+            line = bisect_right(line_starts, offset)
+            start = line_starts[line - 1]
+            column = offset - start
+            if self.surrogates:
+                column += len(ASTRAL.findall(self.text, start, offset))
+            return line, column
+        
+        batch = []
+        for match in self.pattern.finditer(self.text):
+            if self.cancelled:
+                return
+            # Empty matches have nothing to highlight
+            if match.start() == match.end():
+                continue
+            batch.append((position(match.start()), position(match.end())))
+            if len(batch) >= self.BATCH:
+                self.results.put(batch)
+                batch = []
+        self.results.put(batch)
+        self.results.put(None)
+
+PY_KEYWORDS = frozenset(keyword.kwlist)
+PY_BUILTINS = frozenset(name for name in dir(builtins) if not name.startswith("_"))
+
+# One token per match; triple-quoted strings are finished by TRIPLE_QUOTE_END
+# since they may run onto later lines
+PY_TOKEN = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<triple>[rbuf]{0,2}(?:\"\"\"|'''))
+  | (?P<string>[rbuf]{0,2}(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?))
+  | (?P<decorator>^\s*@[\w.]+)
+  | (?P<number>\b(?:0[xob][\da-f_]+|\d[\d_]*\.?[\d_]*(?:e[+-]?\d+)?j?)\b|\.\d[\d_]*(?:e[+-]?\d+)?j?\b)
+  | (?P<name>\b[a-z_]\w*)
+""", re.VERBOSE | re.IGNORECASE)
+TRIPLE_QUOTE_END = {quote: re.compile(r"(?:\\.|[^\\])*?" + quote) for quote in ('"""', "'''")}
+
+def tokenize_python_line(line, state):
+    """Highlight spans (tag, start, end) for one line, and the lexer state at its end.
+    
+    The state is None, or the quotes of a triple-quoted string left open.
+    """
+    spans = []
+    position = 0
+    if state is not None:
+        match = TRIPLE_QUOTE_END[state].match(line)
+        if match is None:
+            return [("py_string", 0, len(line))], state
+        position = match.end()
+        spans.append(("py_string", 0, position))
+    
+    definition = False
+    while True:
+        match = PY_TOKEN.search(line, position)
+        if match is None:
+            return spans, None
+        kind = match.lastgroup
+        start, position = match.span()
+        if kind == "triple":
+            quote = match.group()[-3:]
+            end = TRIPLE_QUOTE_END[quote].match(line, position)
+            if end is None:
+                spans.append(("py_string", start, len(line)))
+                return spans, quote
+            position = end.end()
+            spans.append(("py_string", start, position))
+        elif kind == "name":
+            word = match.group()
+            if definition:
+                spans.append(("py_definition", start, position))
+            elif word in PY_KEYWORDS:
+                spans.append(("py_keyword", start, position))
+            elif word in PY_BUILTINS:
+                spans.append(("py_builtin", start, position))
+            definition = word in ("def", "class")
+            continue
+        else:
+            spans.append(("py_" + kind, start, position))
+        definition = False
+
+class PythonHighlighter:
+    """Colours Python source in a SimpleNotepad, a screenful at a time.
+    
+    The lexer state at the start of every line is cached. After an edit,
+    lines are re-tokenized from the first one it touched only until the
+    state they end in matches the cache again, and lines are only tagged
+    once they come into view. The work runs in short after() slices and
+    tags are added and removed in one call per tag, so typing stays
+    responsive in long files.
+    """
+    COLOURS = {
+        "py_keyword": "#ff7700",
+        "py_builtin": "#900090",
+        "py_string": "#00aa00",
+        "py_comment": "#dd0000",
+        "py_number": "#1750eb",
+        "py_definition": "#0000ff",
+        "py_decorator": "#aa6600",
+    }
+    # Seconds of tokenizing per slice before handing back to the event loop
+    SLICE_TIME = 0.005
+    # Lines read from the document at a time
+    BLOCK_LINES = 200
+    # Lines past the bottom of the view tagged ahead of scrolling
+    LOOKAHEAD = 50
+    # Start state of a line that has never been tokenized
+    UNKNOWN = object()
+    
+    def __init__(self, notepad):
+        self.notepad = notepad
+        self.enabled = False
+        self.job = None
+        for tag, colour in self.COLOURS.items():
+            notepad.text_area.tag_configure(tag, foreground=colour)
+        notepad.text_area.tag_raise(tk.SEL)
+        self.reset()
+    
+    def reset(self):
+        """Forget everything cached, e.g. when a new file is shown"""
+        lines = self.notepad.document.line_count
+        # states[i] is the lexer state at the start of line i + 1, and
+        # painted[i] whether line i + 1 carries tags for its current text
+        self.states = [None] + [self.UNKNOWN] * lines
+        self.painted = bytearray(lines)
+        # The start states of lines up to `frontier` are right. Those up to
+        # `verified` are consistent with each other past `edited_to`, so once
+        # the lexer is past that line and its state agrees with the cache it
+        # can skip ahead to `verified`.
+        self.frontier = 1
+        self.verified = 1
+        self.edited_to = 0
+    
+    def set_enabled(self, enabled):
+        call = self.notepad.root.tk.call
+        for tag in self.COLOURS:
+            call(self.notepad.text_command, "tag", "remove", tag, "1.0", "end")
+        self.enabled = enabled
+        self.reset()
+        self.schedule()
+    
+    def edited(self, first_line, last_line, new_last_line):
+        """Lines first_line..last_line were replaced by first_line..new_last_line"""
+        if not self.enabled:
+            return
+        added = new_last_line - last_line
+        # The cache can't be trusted again until the lexer is past this edit,
+        # and past any earlier edit or unfinished pass
+        pending = [self.edited_to]
+        if self.frontier <= len(self.painted):
+            pending.append(self.frontier)
+        self.edited_to = max(line + added if line > last_line else new_last_line for line in pending)
+        self.frontier = min(self.frontier, first_line)
+        self.verified = self.verified + added if self.verified > last_line else min(self.verified, first_line)
+        
+        self.states[first_line:last_line] = [self.UNKNOWN] * (new_last_line - first_line)
+        self.painted[first_line - 1:last_line] = bytes(new_last_line - first_line + 1)
+        self.schedule()
+    
+    def schedule(self):
+        if self.enabled and self.job is None:
+            self.job = self.notepad.root.after_idle(self.run)
+    
+    def read_lines(self, first, last):
+        document = self.notepad.document
+        return document.text(document.line_start(first), document.line_end(last)).split("\n")
+    
+    def run(self):
+        """Tag the visible lines that need it, re-tokenizing as little as possible"""
+        self.job = None
+        if not self.enabled:
+            return
+        notepad = self.notepad
+        call = notepad.root.tk.call
+        widget = notepad.text_command
+        top = int(call(widget, "index", "@0,0").split(".")[0])
+        bottom = int(call(widget, "index", f"@0,{notepad.text_area.winfo_height()}").split(".")[0])
+        last = min(bottom + self.LOOKAHEAD, len(self.painted))
+        deadline = time.perf_counter() + self.SLICE_TIME
+        tagged = []
+        
+        # Visible lines behind the frontier already have their start state
+        end = min(last, self.frontier - 1)
+        index = self.painted.find(0, top - 1, end)
+        while index >= 0 and time.perf_counter() < deadline:
+            line_text, = self.read_lines(index + 1, index + 1)
+            tagged.append((index + 1, self.tk_spans(line_text, tokenize_python_line(line_text, self.states[index])[0])))
+            self.painted[index] = 1
+            index = self.painted.find(0, index + 1, end)
+        
+        # Then move the frontier down to the bottom of the view
+        while self.frontier <= last and time.perf_counter() < deadline:
+            first = self.frontier
+            for line, line_text in enumerate(self.read_lines(first, min(first + self.BLOCK_LINES - 1, last)), first):
+                spans, state = tokenize_python_line(line_text, self.states[line - 1])
+                if line >= top and not self.painted[line - 1]:
+                    tagged.append((line, self.tk_spans(line_text, spans)))
+                    self.painted[line - 1] = 1
+                
+                converged = state == self.states[line]
+                if not converged and line < len(self.painted):
+                    # The next line's tags were made for a different start state
+                    self.painted[line] = 0
+                self.states[line] = state
+                self.frontier = line + 1
+                self.verified = max(self.verified, self.frontier)
+                if converged and line >= self.edited_to and self.verified > self.frontier:
+                    self.frontier = self.verified
+                    break
+                if time.perf_counter() >= deadline:
+                    break
+        if self.frontier > len(self.painted):
+            self.edited_to = 0
+        
+        self.apply_tags(tagged)
+        if self.frontier <= last or self.painted.find(0, top - 1, last) >= 0:
+            self.job = notepad.root.after(1, self.run)
+    
+    def tk_spans(self, line_text, spans):
+        """The spans of a line with their columns counted the way Tk counts them"""
+        if not self.notepad.surrogates or not ASTRAL.search(line_text):
+            return spans
+        return [(tag, tk_column(line_text, start), tk_column(line_text, end)) for tag, start, end in spans]
+    
+    def apply_tags(self, tagged):
+        """Retag whole lines with one tag remove and one tag add per tag"""
+        if not tagged:
+            return
+        call = self.notepad.root.tk.call
+        widget = self.notepad.text_command
+        lines = []
+        ranges = {tag: [] for tag in self.COLOURS}
+        for line, spans in tagged:
+            lines += (f"{line}.0", f"{line}.0 lineend")
+            for tag, start, end in spans:
+                ranges[tag] += (f"{line}.{start}", f"{line}.{end}")
+        for tag, indexes in ranges.items():
+            call(widget, "tag", "remove", tag, *lines)
+            if indexes:
+                call(widget, "tag", "add", tag, *indexes)
 
 class SimpleNotepad:
+    # Lines of a large file kept in the text widget at once
+    WINDOW_LINES = 3000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Simple Notepad")
         self.root.geometry("800x600")
+        # Whether Tk columns count a character outside the BMP as two
+        self.surrogates = int(self.root.tk.call("string", "length", "\U0001F600")) == 2
         
         # Set the file path to None initially (no file opened yet)
         self.file_path = None
         
+        # The save in progress, and a count of edits to tell whether the
+        # buffer changed while it was running
+        self.saver = None
+        self.edit_count = 0
+        
+        # Large-file mode: the open LargeFile and the lines shown from it
+        self.large_file = None
+        self.window_start = 0
+        self.window_end = 0
+        
         # Create the main menu
         self.menu_bar = tk.Menu(root)
         self.root.config(menu=self.menu_bar)
@@ -35,6 +678,10 @@ class SimpleNotepad:
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Undo", command=self.undo_text, accelerator="Ctrl+Z")
         self.edit_menu.add_command(label="Redo", command=self.redo_text, accelerator="Ctrl+Y")
+        self.edit_menu.add_separator()
+        self.edit_menu.add_command(label="Find...", command=self.show_find, accelerator="Ctrl+F")
+        self.edit_menu.add_command(label="Find Next", command=self.find_next, accelerator="F3")
+        self.edit_menu.add_command(label="Replace...", command=self.show_find, accelerator="Ctrl+H")
         
         # Format Menu
         self.format_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -80,6 +727,10 @@ class SimpleNotepad:
         self.line_column_display = tk.Label(self.status_frame, text="Ln 1, Col 1", padx=5)
         self.line_column_display.pack(side=tk.RIGHT)
         
+        # Document line and word counts
+        self.stats_display = tk.Label(self.status_frame, text="Lines: 1  Words: 0", padx=5)
+        self.stats_display.pack(side=tk.RIGHT)
+        
         # Create the main text area with a scrollbar
         self.text_frame = tk.Frame(root)
         self.text_frame.pack(fill=tk.BOTH, expand=True)
@@ -93,8 +744,9 @@ class SimpleNotepad:
         self.text_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
         
         # Create the text widget
-        self.text_area = tk.Text(self.text_frame, undo=True, wrap=tk.NONE, 
-                              yscrollcommand=self.text_scroll_y.set,
+        # Undo is handled by the document model, not by the widget
+        self.text_area = tk.Text(self.text_frame, undo=False, wrap=tk.NONE, 
+                              yscrollcommand=self.on_text_scroll,
                               xscrollcommand=self.text_scroll_x.set)
         self.text_area.pack(fill=tk.BOTH, expand=True)
         
@@ -110,11 +762,38 @@ class SimpleNotepad:
         self.root.bind("<Control-n>", lambda event: self.new_file())
         self.root.bind("<Control-o>", lambda event: self.open_file())
         self.root.bind("<Control-s>", lambda event: self.save_file())
-        self.text_area.bind("<KeyRelease>", self.update_line_column)
-        self.text_area.bind("<Button-1>", self.update_line_column)
+        self.root.bind("<Control-f>", lambda event: self.show_find())
+        self.root.bind("<Control-h>", lambda event: self.show_find())
+        self.root.bind("<F3>", lambda event: self.find_next())
+        self.text_area.bind("<KeyRelease>", self.schedule_status)
+        self.text_area.bind("<ButtonRelease-1>", self.schedule_status)
+        
+        # The document model is the source of truth; the widget only displays it.
+        # Every edit to the widget is mirrored into it as it happens, which also
+        # tracks modification, keeps the counts current and records undo steps.
+        self.document = PieceTable()
+        self.undo_stack = []
+        self.redo_stack = []
+        self.group_open = False
+        self.word_total = 0
+        self.counts_stale = False
+        self.status_job = None
+        self.install_edit_hook()
+        
+        # Python files are syntax highlighted as they scroll into view
+        self.highlighter = PythonHighlighter(self)
         
-        # Bind text changes to update the modified indicator
-        self.text_area.bind("<<Modified>>", self.on_text_modified)
+        # Find and replace state
+        self.find_var = tk.StringVar()
+        self.replace_var = tk.StringVar()
+        self.regex_var = tk.BooleanVar(value=False)
+        self.case_var = tk.BooleanVar(value=False)
+        self.find_window = None
+        self.search = None
+        self.search_key = None
+        self.match_count = 0
+        self.jump_pending = False
+        self.text_area.tag_configure("found", background="#fff176")
         
         # Initialize the application state
         self.is_modified = False
@@ -135,12 +814,15 @@ class SimpleNotepad:
             if response is None:  # Cancel was pressed
                 return
             elif response:  # Yes was pressed
-                if not self.save_file():
+                if not self.save_file(wait=True):
                     return  # If save was cancelled, don't create new file
                 
         # Clear the text area and reset file state
+        self.close_large_file()
         self.text_area.delete(1.0, tk.END)
+        self.text_area.edit_reset()
         self.file_path = None
+        self.update_highlighting()
         self.is_modified = False
         self.update_title()
         self.status_bar.config(text="New File")
@@ -154,7 +836,7 @@ class SimpleNotepad:
             if response is None:  # Cancel was pressed
                 return
             elif response:  # Yes was pressed
-                if not self.save_file():
+                if not self.save_file(wait=True):
                     return  # If save was cancelled, don't open new file
         
         # Open a file dialog to select a file
@@ -165,17 +847,24 @@ class SimpleNotepad:
         )
         
         if file_path:
+            if os.path.getsize(file_path) >= LARGE_FILE_SIZE:
+                self.open_large_file(file_path)
+                return
+            
             try:
                 # Read file contents
                 with open(file_path, 'r') as file:
                     file_contents = file.read()
                 
                 # Update text area with file contents
+                self.close_large_file()
                 self.text_area.delete(1.0, tk.END)
                 self.text_area.insert(1.0, file_contents)
+                self.text_area.edit_reset()
                 
                 # Update file state
                 self.file_path = file_path
+                self.update_highlighting()
                 self.is_modified = False
                 self.update_title()
                 
@@ -186,34 +875,176 @@ class SimpleNotepad:
             except Exception as e:
                 messagebox.showerror("Error", f"Could not open file: {e}")
     
-    def save_file(self):
-        """Save the current file"""
+    def open_large_file(self, file_path):
+        """Show a big file a window of lines at a time, paging as it scrolls"""
+        try:
+            large_file = LargeFile(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not open file: {e}")
+            return
+        
+        self.close_large_file()
+        self.large_file = large_file
+        self.file_path = file_path
+        self.update_highlighting()
+        self.is_modified = False
+        self.update_title()
+        
+        # The scrollbar now spans the whole file rather than the widget's contents
+        self.text_area.edit_reset()
+        self.text_area.configure(yscrollcommand=self.on_large_scroll)
+        self.text_scroll_y.config(command=self.scroll_large_file)
+        self.show_lines(0)
+        self.poll_large_file()
+    
+    def close_large_file(self):
+        """Leave large-file mode and restore the normal editor"""
+        if self.large_file is None:
+            return
+        self.large_file.close()
+        self.large_file = None
+        self.text_area.configure(state=tk.NORMAL, yscrollcommand=self.on_text_scroll)
+        self.text_scroll_y.config(command=self.text_area.yview)
+        # The document was not tracking the paged window; pick up what is shown
+        self.document = PieceTable(self.text_area.get(1.0, "end-1c"))
+        self.text_area.edit_reset()
+        self.counts_stale = True
+    
+    def update_highlighting(self):
+        """Highlight the text as Python when the file is a .py file"""
+        is_python = bool(self.file_path) and self.file_path.endswith(".py")
+        self.highlighter.set_enabled(is_python and self.large_file is None)
+    
+    def on_text_scroll(self, first, last):
+        """yscrollcommand: move the scrollbar and colour lines coming into view"""
+        self.text_scroll_y.set(first, last)
+        self.highlighter.schedule()
+    
+    def show_lines(self, top_line):
+        """Load the window of lines around `top_line` and scroll it to the top"""
+        total = self.large_file.line_count
+        start = max(0, min(top_line - self.WINDOW_LINES // 3, total - self.WINDOW_LINES))
+        end = min(start + self.WINDOW_LINES, total)
+        
+        self.text_area.configure(state=tk.NORMAL)
+        self.text_area.delete(1.0, tk.END)
+        # The widget supplies its own final newline
+        text = self.large_file.lines(start, end)
+        self.text_area.insert(1.0, text[:-1] if text.endswith("\n") else text)
+        self.text_area.configure(state=tk.DISABLED)
+        self.window_start, self.window_end = start, end
+        self.text_area.yview(f"{top_line - start + 1}.0")
+    
+    def on_large_scroll(self, first, last):
+        """yscrollcommand in large-file mode: page near the window edges and map the scrollbar to the file"""
+        first, last = float(first), float(last)
+        shown = self.window_end - self.window_start
+        top_line = self.window_start + int(first * shown)
+        
+        near_top = first < 0.1 and self.window_start > 0
+        near_bottom = last > 0.9 and self.window_end < self.large_file.line_count
+        if near_top or near_bottom:
+            # Moves the window; the resulting scroll calls back here with the new position
+            self.show_lines(top_line)
+            return
+        
+        total = max(self.large_file.line_count, 1)
+        self.text_scroll_y.set((self.window_start + first * shown) / total,
+                               (self.window_start + last * shown) / total)
+    
+    def scroll_large_file(self, *args):
+        """Scrollbar command in large-file mode"""
+        if args[0] == "moveto":
+            self.show_lines(int(float(args[1]) * self.large_file.line_count))
+        else:
+            self.text_area.yview(*args)
+    
+    def poll_large_file(self):
+        """Report indexing progress and fill the window as more lines become available"""
+        large_file = self.large_file
+        if large_file is None:
+            return
+        
+        file_name = os.path.basename(large_file.path)
+        if self.window_end - self.window_start < self.WINDOW_LINES and self.window_end < large_file.line_count:
+            top_line = int(self.text_area.index("@0,0").split(".")[0]) - 1
+            self.show_lines(self.window_start + top_line)
+        
+        if large_file.indexed:
+            self.status_bar.config(text=f"Opened: {file_name} ({large_file.line_count:,} lines, read-only large file)")
+        else:
+            self.status_bar.config(text=f"Indexing {file_name}: {large_file.line_count:,} lines so far...")
+            self.root.after(200, self.poll_large_file)
+    
+    def save_file(self, wait=False):
+        """Save the current file.
+        
+        The write runs in the background and reports progress in the status
+        bar; pass wait=True to block until it is on disk and get its result.
+        """
+        if self.large_file is not None:
+            return self.save_large_file(wait)
+        
         if self.file_path:
-            try:
-                # Get text content
-                text_content = self.text_area.get(1.0, tk.END)
-                
-                # Write to file
-                with open(self.file_path, 'w') as file:
-                    file.write(text_content)
-                
-                # Update file state
-                self.is_modified = False
-                self.update_title()
-                
-                # Update status bar
-                file_name = os.path.basename(self.file_path)
-                self.status_bar.config(text=f"Saved: {file_name}")
-                return True
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Could not save file: {e}")
-                return False
+            # A snapshot of the document is free and unaffected by further typing
+            return self.start_save(FileSaver(self.file_path, document=self.document.snapshot()), wait)
         else:
             # If no file path exists, use Save As instead
-            return self.save_as_file()
+            return self.save_as_file(wait)
+    
+    def save_large_file(self, wait=False):
+        """Large files are read-only; saving copies the original to the new path"""
+        if os.path.abspath(self.file_path) == os.path.abspath(self.large_file.path):
+            return True
+        return self.start_save(FileSaver(self.file_path, source_path=self.large_file.path), wait)
     
-    def save_as_file(self):
+    def start_save(self, saver, wait):
+        """Track a FileSaver until it finishes"""
+        # Let an earlier save land first so the newer contents win the rename
+        if self.saver is not None:
+            self.saver.thread.join()
+            self.finish_save(self.saver)
+        
+        self.saver = saver
+        saver.edit_count = self.edit_count
+        if wait:
+            saver.thread.join()
+            return self.finish_save(saver)
+        self.poll_save(saver)
+        return True
+    
+    def poll_save(self, saver):
+        """Show save progress in the status bar until the write completes"""
+        if saver is not self.saver:
+            return
+        if saver.done:
+            self.finish_save(saver)
+            return
+        file_name = os.path.basename(saver.path)
+        self.status_bar.config(text=f"Saving {file_name}... {saver.progress}%")
+        self.root.after(100, self.poll_save, saver)
+    
+    def finish_save(self, saver):
+        """Update the editor state once a save has completed"""
+        if saver is not self.saver:
+            return saver.error is None
+        self.saver = None
+        
+        if saver.error is not None:
+            messagebox.showerror("Error", f"Could not save file: {saver.error}")
+            return False
+        
+        # Edits made while saving are not in the file
+        if self.edit_count == saver.edit_count:
+            self.is_modified = False
+        self.update_title()
+        
+        # Update status bar
+        file_name = os.path.basename(saver.path)
+        self.status_bar.config(text=f"Saved: {file_name}")
+        return True
+    
+    def save_as_file(self, wait=False):
         """Save the current file with a new name"""
         # Open a file dialog to select a save location
         file_path = filedialog.asksaveasfilename(
@@ -226,7 +1057,8 @@ class SimpleNotepad:
         if file_path:
             # Update file path and save
             self.file_path = file_path
-            return self.save_file()
+            self.update_highlighting()
+            return self.save_file(wait)
         return False
     
     def exit_app(self):
@@ -238,9 +1070,12 @@ class SimpleNotepad:
             if response is None:  # Cancel was pressed
                 return
             elif response:  # Yes was pressed
-                if not self.save_file():
+                if not self.save_file(wait=True):
                     return  # If save was cancelled, don't exit
         
+        if self.saver is not None:
+            self.saver.thread.join()
+        self.close_large_file()
         self.root.destroy()
     
     def cut_text(self):
@@ -283,20 +1118,384 @@ class SimpleNotepad:
             # Nothing to redo
             pass
     
+    def show_find(self):
+        """Open the Find and Replace window"""
+        if self.find_window is not None:
+            self.find_window.lift()
+            return
+        
+        window = self.find_window = tk.Toplevel(self.root)
+        window.title("Find and Replace")
+        window.transient(self.root)
+        window.resizable(False, False)
+        window.protocol("WM_DELETE_WINDOW", self.close_find)
+        
+        tk.Label(window, text="Find:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        find_entry = tk.Entry(window, textvariable=self.find_var, width=30)
+        find_entry.grid(row=0, column=1, columnspan=2, padx=5, pady=5)
+        find_entry.bind("<Return>", lambda event: self.find_next())
+        find_entry.focus_set()
+        
+        tk.Label(window, text="Replace:").grid(row=1, column=0, sticky=tk.W, padx=5)
+        tk.Entry(window, textvariable=self.replace_var, width=30).grid(row=1, column=1, columnspan=2, padx=5)
+        
+        tk.Checkbutton(window, text="Regular expression", variable=self.regex_var).grid(row=2, column=1, sticky=tk.W)
+        tk.Checkbutton(window, text="Match case", variable=self.case_var).grid(row=2, column=2, sticky=tk.W)
+        
+        tk.Button(window, text="Find Next", width=12, command=self.find_next).grid(row=0, column=3, padx=5, pady=5)
+        tk.Button(window, text="Replace All", width=12, command=self.replace_all).grid(row=1, column=3, padx=5)
+        tk.Button(window, text="Close", width=12, command=self.close_find).grid(row=2, column=3, padx=5, pady=5)
+    
+    def close_find(self):
+        """Close the Find and Replace window and clear the highlights"""
+        self.cancel_search()
+        self.text_area.tag_remove("found", 1.0, tk.END)
+        self.search_key = None
+        self.find_window.destroy()
+        self.find_window = None
+    
+    def compile_pattern(self):
+        """Build the regex from the find box, or None if it is empty or invalid"""
+        text = self.find_var.get()
+        if not text:
+            return None
+        flags = 0 if self.case_var.get() else re.IGNORECASE
+        try:
+            return re.compile(text if self.regex_var.get() else re.escape(text), flags)
+        except re.error as e:
+            messagebox.showerror("Find", f"Invalid regular expression: {e}")
+            return None
+    
+    def cancel_search(self):
+        if self.search is not None:
+            self.search.cancelled = True
+            self.search = None
+    
+    def find_next(self):
+        """Select the next match after the cursor, searching first if needed"""
+        pattern = self.compile_pattern()
+        if pattern is None:
+            return
+        
+        # Highlights follow edits, but new text may hold new matches; a large
+        # file's window is replaced wholesale as it pages
+        key = (pattern.pattern, pattern.flags, self.edit_count, self.window_start if self.large_file else None)
+        if key != self.search_key:
+            self.start_search(pattern, key)
+        self.jump_pending = True
+        self.jump_to_match()
+    
+    def start_search(self, pattern, key):
+        """Highlight every match, matching off the UI thread"""
+        self.cancel_search()
+        self.text_area.tag_remove("found", 1.0, tk.END)
+        self.search_key = key
+        self.match_count = 0
+        if self.large_file is not None:
+            # The document isn't tracking a large file; Find covers the loaded window
+            document = PieceTable(self.text_area.get(1.0, "end-1c"))
+        else:
+            document = self.document.snapshot()
+        self.search = SearchWorker(document, pattern, surrogates=self.surrogates)
+        self.status_bar.config(text="Searching...")
+        self.poll_search(self.search)
+    
+    def poll_search(self, search):
+        """Apply one batch of highlights per event loop turn"""
+        if search is not self.search:
+            return
+        try:
+            batch = search.results.get_nowait()
+        except queue.Empty:
+            self.root.after(20, self.poll_search, search)
+            return
+        
+        if isinstance(batch, Exception):
+            self.search = None
+            messagebox.showerror("Find", f"Search failed: {batch}")
+            return
+        if batch is None:
+            self.search = None
+            self.status_bar.config(text=f"{self.match_count:,} matches")
+            self.jump_to_match()
+            return
+        
+        if batch:
+            # One Tcl call tags the whole batch
+            self.text_area.tag_add("found", *[f"{line}.{column}" for match in batch for line, column in match])
+            self.match_count += len(batch)
+            self.status_bar.config(text=f"Searching... {self.match_count:,} matches")
+            self.jump_to_match()
+        self.root.after(1, self.poll_search, search)
+    
+    def jump_to_match(self):
+        """Select the first highlighted match after the cursor once one is known"""
+        if not self.jump_pending:
+            return
+        # Continue past the current selection, which is the previous match
+        start = tk.SEL_LAST if self.text_area.tag_ranges(tk.SEL) else tk.INSERT
+        found = self.text_area.tag_nextrange("found", start)
+        if not found and self.search is None:
+            # Nothing after the cursor: wrap around to the top
+            found = self.text_area.tag_nextrange("found", 1.0)
+        if not found:
+            if self.search is None:
+                self.jump_pending = False
+                self.status_bar.config(text="No matches")
+            return
+        
+        self.jump_pending = False
+        start, end = found
+        self.text_area.tag_remove(tk.SEL, 1.0, tk.END)
+        self.text_area.tag_add(tk.SEL, start, end)
+        self.text_area.mark_set(tk.INSERT, start)
+        self.text_area.see(start)
+        self.update_line_column()
+    
+    def replace_all(self):
+        """Replace every match as a single undoable edit"""
+        pattern = self.compile_pattern()
+        if pattern is None:
+            return
+        if self.large_file is not None:
+            messagebox.showinfo("Replace", "Large files are opened read-only.")
+            return
+        
+        replacement = self.replace_var.get()
+        if not self.regex_var.get():
+            # Literal text: no group references or escapes
+            replacement = replacement.replace("\\", "\\\\")
+        self.cancel_search()
+        self.search = SearchWorker(self.document.snapshot(), pattern, replacement)
+        self.status_bar.config(text="Replacing...")
+        self.poll_replace(self.search, self.edit_count)
+    
+    def poll_replace(self, search, edit_count):
+        """Apply the replaced text once the worker has built it"""
+        if search is not self.search:
+            return
+        try:
+            result = search.results.get_nowait()
+        except queue.Empty:
+            self.root.after(20, self.poll_replace, search, edit_count)
+            return
+        self.search = None
+        
+        if isinstance(result, Exception):
+            messagebox.showerror("Replace", f"Replace failed: {result}")
+            return
+        if edit_count != self.edit_count:
+            self.status_bar.config(text="Text changed while replacing; nothing was replaced")
+            return
+        new_text, count = result
+        if not count:
+            self.status_bar.config(text="No matches")
+            return
+        
+        # One delete and insert between separators is one undo step
+        insert = self.text_area.index(tk.INSERT)
+        top = self.text_area.yview()[0]
+        self.text_area.configure(autoseparators=False)
+        self.text_area.edit_separator()
+        self.text_area.delete(1.0, "end-1c")
+        self.text_area.insert(1.0, new_text)
+        self.text_area.edit_separator()
+        self.text_area.configure(autoseparators=True)
+        self.text_area.mark_set(tk.INSERT, insert)
+        self.text_area.yview_moveto(top)
+        
+        self.search_key = None
+        self.status_bar.config(text=f"Replaced {count:,} matches")
+    
+    def install_edit_hook(self):
+        """Route the text widget's Tcl command through on_text_command"""
+        widget = self.text_area._w
+        self.text_command = widget + "_inner"
+        self.root.tk.call("rename", widget, self.text_command)
+        self.root.tk.createcommand(widget, self.on_text_command)
+    
+    def on_text_command(self, *args):
+        """Every call into the text widget, from Python or from its own bindings, passes here"""
+        if args[0] in ("insert", "delete", "replace"):
+            return self.tracked_edit(args)
+        if args[0] == "edit" and len(args) > 1:
+            if args[1] == "undo":
+                return self.undo()
+            if args[1] == "redo":
+                return self.redo()
+            if args[1] == "separator":
+                self.group_open = False
+                return ""
+            if args[1] == "reset":
+                self.undo_stack.clear()
+                self.redo_stack.clear()
+                self.group_open = False
+                return ""
+        return self.root.tk.call((self.text_command,) + args)
+    
+    def text_index(self, index):
+        """Normalize an index, clamped to the last character as Tk does for edits"""
+        call = self.root.tk.call
+        if self.root.tk.getboolean(call(self.text_command, "compare", index, ">", "end-1c")):
+            index = "end-1c"
+        return call(self.text_command, "index", index)
+    
+    def document_offset(self, index):
+        """The document offset of a normalized Tk index"""
+        line, column = map(int, index.split("."))
+        document = self.document
+        start = document.line_start(line)
+        if self.surrogates and column:
+            # A line holds at least as many Tk characters as code points
+            column = code_point_column(document.text(start, min(start + column, document.line_end(line))), column)
+        return start + column
+    
+    def tracked_edit(self, args):
+        """Run an insert, delete or replace on the widget and mirror it into the document"""
+        call = self.root.tk.call
+        command = args[0]
+        if self.large_file is not None:
+            # Paging a large file in and out is not an edit
+            return call((self.text_command,) + args)
+        if command == "delete" and len(args) > 3:
+            # Several ranges at once: delete them one at a time, last first
+            ranges = sorted(zip(args[1::2], args[2::2]),
+                            key=lambda pair: self.document_offset(self.text_index(pair[0])), reverse=True)
+            for first, last in ranges:
+                self.tracked_edit(("delete", first, last))
+            return ""
+        
+        if command == "insert":
+            first = last = self.text_index(args[1])
+            inserted = "".join(args[2::2])
+        else:
+            first = self.text_index(args[1])
+            last = self.text_index(args[2] if len(args) > 2 else f"{args[1]}+1c")
+            inserted = "".join(args[3::2]) if command == "replace" else ""
+        first_line = int(first.split(".")[0])
+        last_line = int(last.split(".")[0])
+        document = self.document
+        start, end = self.document_offset(first), self.document_offset(last)
+        if end <= start and not inserted:
+            return call((self.text_command,) + args)
+        
+        deleted = document.text(start, end)
+        root = document.root
+        
+        result = call((self.text_command,) + args)
+        self.edit_document(start, end, first_line, last_line, inserted)
+        self.record_undo(root, first, deleted, inserted)
+        self.on_text_modified()
+        return result
+    
+    def edit_document(self, start, end, first_line, last_line, inserted):
+        """Replace the text between two offsets, spanning first_line to last_line,
+        keeping the word count and the highlighting in step"""
+        document = self.document
+        # Words never span lines, so recounting the whole touched lines is exact
+        if not self.counts_stale:
+            before = document.text(document.line_start(first_line), document.line_end(last_line))
+        document.delete(start, end)
+        document.insert(start, inserted)
+        
+        new_last_line = first_line + inserted.count("\n")
+        self.highlighter.edited(first_line, last_line, new_last_line)
+        if not self.counts_stale:
+            after = document.text(document.line_start(first_line), document.line_end(new_last_line))
+            self.word_total += len(after.split()) - len(before.split())
+    
+    def record_undo(self, root, position, deleted, inserted):
+        """Add an edit to the current undo group, or start a new one.
+        
+        Groups keep the document roots from before and after, so undo and redo
+        restore the model directly and only replay the edits on the widget.
+        """
+        kind = "delete" if not inserted else "insert" if not deleted else "replace"
+        group = self.undo_stack[-1] if self.undo_stack and self.group_open else None
+        autoseparators = self.root.tk.getboolean(self.root.tk.call(self.text_command, "cget", "-autoseparators"))
+        if group is None or (autoseparators and (group["kind"] != kind or "\n" in inserted)):
+            group = {"kind": kind, "before": root, "edits": []}
+            self.undo_stack.append(group)
+        group["edits"].append((position, deleted, inserted))
+        group["after"] = self.document.root
+        self.group_open = True
+        self.redo_stack.clear()
+    
+    def replay_edits(self, edits, reverse):
+        """Apply recorded edits, or their inverses, to the widget and the document.
+        
+        Undo and redo then put back the group's saved root, which holds the same
+        text; replaying into the document keeps the counts exact without a rescan.
+        """
+        call = self.root.tk.call
+        for position, deleted, inserted in (reversed(edits) if reverse else edits):
+            removed, added = (inserted, deleted) if reverse else (deleted, inserted)
+            line = int(position.split(".")[0])
+            start = self.document_offset(position)
+            length = tk_length(removed) if self.surrogates else len(removed)
+            call(self.text_command, "delete", position, f"{position}+{length}c")
+            call(self.text_command, "insert", position, added)
+            self.edit_document(start, start + len(removed), line, line + removed.count("\n"), added)
+        self.text_area.mark_set(tk.INSERT, edits[0][0])
+        self.text_area.see(tk.INSERT)
+    
+    def undo(self):
+        if not self.undo_stack:
+            return ""
+        group = self.undo_stack.pop()
+        self.replay_edits(group["edits"], reverse=True)
+        self.document.root = group["before"]
+        self.redo_stack.append(group)
+        self.group_open = False
+        self.on_text_modified()
+        return ""
+    
+    def redo(self):
+        if not self.redo_stack:
+            return ""
+        group = self.redo_stack.pop()
+        self.replay_edits(group["edits"], reverse=False)
+        self.document.root = group["after"]
+        self.undo_stack.append(group)
+        self.group_open = False
+        self.on_text_modified()
+        return ""
+    
+    def schedule_status(self, event=None):
+        """Coalesce status bar updates to at most one per frame"""
+        if self.status_job is None:
+            self.status_job = self.root.after(16, self.update_status)
+    
+    def update_status(self):
+        """Refresh the title, cursor position and counts in one pass"""
+        self.status_job = None
+        self.update_title()
+        self.update_line_column()
+        
+        if self.large_file is not None:
+            self.stats_display.config(text=f"Lines: {self.large_file.line_count:,}")
+            return
+        if self.counts_stale:
+            self.word_total = len(self.document.text().split())
+            self.counts_stale = False
+        self.stats_display.config(text=f"Lines: {self.document.line_count:,}  Words: {self.word_total:,}")
+    
     def update_line_column(self, event=None):
         """Update the line and column display"""
         position = self.text_area.index(tk.INSERT)
         line, column = position.split('.')
+        line = int(line) + self.window_start if self.large_file else int(line)
         self.line_column_display.config(text=f"Ln {line}, Col {int(column) + 1}")
     
     def on_text_modified(self, event=None):
         """Called when the text is modified"""
-        if not self.is_modified:
-            self.is_modified = True
-            self.update_title()
+        # Paging a large file in and out is not an edit
+        if self.large_file is not None:
+            return
         
-        # Reset the modified flag for the widget (but keep our is_modified state)
-        self.text_area.edit_modified(False)
+        self.edit_count += 1
+        self.is_modified = True
+        self.schedule_status()
     
     def update_title(self):
         """Update the window title to reflect the current file and modified state"""
@@ -0,0 +1,50 @@
+"""Tests for the parts of notepad.py that run without a display.
+
+    python -m unittest test_notepad
+"""
+import re
+import unittest
+
+from notepad import PieceTable, SearchWorker, code_point_column, tk_column, tk_length
+
+EMOJI = "\U0001F600"
+
+class TkColumnTests(unittest.TestCase):
+    def test_columns_after_an_emoji_are_shifted_by_one(self):
+        line = f"a{EMOJI}b"
+        # Tcl 8.6 sees "a", two surrogates, then "b"
+        self.assertEqual([tk_column(line, column) for column in range(4)], [0, 1, 3, 4])
+        self.assertEqual([code_point_column(line, column) for column in (0, 1, 3, 4)], [0, 1, 2, 3])
+
+    def test_columns_without_astral_characters_are_unchanged(self):
+        self.assertEqual(tk_column("plain", 3), 3)
+        self.assertEqual(code_point_column("plain", 3), 3)
+
+    def test_tk_length(self):
+        self.assertEqual(tk_length(f"a{EMOJI}b{EMOJI}"), 6)
+
+    def test_edit_after_an_emoji_lands_where_tk_puts_it(self):
+        document = PieceTable(f"a{EMOJI}b\n")
+        # Tk inserts at 1.3, between the emoji and "b"
+        start = document.line_start(1)
+        offset = start + code_point_column(document.text(start, document.line_end(1)), 3)
+        document.insert(offset, "X")
+        self.assertEqual(document.text(), f"a{EMOJI}Xb\n")
+
+class SearchWorkerTests(unittest.TestCase):
+    def matches(self, text, pattern, surrogates):
+        search = SearchWorker(PieceTable(text), re.compile(pattern), surrogates=surrogates)
+        search.thread.join()
+        batch = search.results.get()
+        self.assertIsNone(search.results.get())
+        return batch
+
+    def test_match_positions_count_surrogates(self):
+        text = f"x\n{EMOJI} foo {EMOJI}{EMOJI}foo"
+        self.assertEqual(self.matches(text, "foo", surrogates=True),
+                         [((2, 3), (2, 6)), ((2, 11), (2, 14))])
+        self.assertEqual(self.matches(text, "foo", surrogates=False),
+                         [((2, 2), (2, 5)), ((2, 8), (2, 11))])
+
+if __name__ == "__main__":
+    unittest.main()
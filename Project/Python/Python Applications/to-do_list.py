@@ -2,9 +2,584 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import json
 import os
-from datetime import datetime
+import queue
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from itertools import chain
+
+class TaskJournal:
+    """Crash-safe task storage: a JSON snapshot plus an append-only journal.
+    
+    Every change is appended to the journal as one JSON line and fsynced, so
+    a save costs the size of the change rather than the whole list. Once the
+    journal grows past COMPACT_EVERY entries the full list is written to the
+    snapshot atomically (temp file, fsync, rename) and the journal is emptied.
+    Snapshot and journal entries carry a generation number, so entries left
+    over from a crash between those two steps are not applied twice.
+    
+    Writes happen on a background thread started by start(). Changes queued
+    by append() are collected until none arrive for DEBOUNCE seconds (or
+    MAX_DELAY passes) and then written with a single fsync. Compaction
+    rebuilds the snapshot from the files on that thread too, so the UI never
+    serializes the whole list. Errors are kept in `error` for the UI to report.
+    
+    Loading skips journal lines it can't parse and entries for tasks it
+    doesn't have, rather than giving up on everything after them. If the
+    files can't be read at all, disable() stops any further writes to them.
+    """
+    COMPACT_EVERY = 500
+    DEBOUNCE = 0.5
+    MAX_DELAY = 2.0
+    
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.entries = 0
+        self.generation = 0
+        self.journal = None
+        self.pending = queue.Queue()
+        self.thread = None
+        self.error = None
+        # Highest task ID seen in the files, including tasks since deleted
+        self.max_id = 0
+        self.read_only = False
+    
+    def load(self):
+        """Read the snapshot and replay the journal on top of it.
+        
+        Returns a dict of tasks keyed by their ID, in creation order.
+        """
+        tasks = []
+        self.generation = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                snapshot = json.load(f)
+            # Files saved before the journal existed are a bare list
+            if isinstance(snapshot, list):
+                tasks = snapshot
+            else:
+                tasks = snapshot["tasks"]
+                self.generation = snapshot["generation"]
+        
+        # Tasks saved before they had IDs are numbered in list order
+        next_id = max((task["id"] for task in tasks if "id" in task), default=0) + 1
+        for task in tasks:
+            if "id" not in task:
+                task["id"] = next_id
+                next_id += 1
+        tasks = {task["id"]: task for task in tasks}
+        self.max_id = max(tasks, default=0)
+        
+        self.entries = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb+') as f:
+                position = valid = 0
+                for line in f:
+                    position += len(line)
+                    # A line without its newline was torn by a crash mid-write
+                    try:
+                        entry = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        entry = None
+                    if not isinstance(entry, dict):
+                        continue
+                    valid = position
+                    if entry.get("gen") == self.generation:
+                        try:
+                            self.replay(tasks, entry)
+                        except (KeyError, TypeError):
+                            # Malformed, so skipped like an unreadable line
+                            continue
+                        self.entries += 1
+                # Cut off a torn tail so new entries start on a clean line
+                f.truncate(valid)
+        return tasks
+    
+    def replay(self, tasks, entry):
+        """Apply one journal entry to the tasks dict"""
+        op = entry["op"]
+        if op == "add":
+            tasks[entry["task"]["id"]] = entry["task"]
+            self.max_id = max(self.max_id, entry["task"]["id"])
+            return
+        if op == "clear_completed":
+            for task_id in [task_id for task_id, task in tasks.items() if task["completed"]]:
+                del tasks[task_id]
+            return
+        if op == "delete_all":
+            tasks.clear()
+            return
+        
+        task_id = entry["id"]
+        if task_id not in tasks:
+            # Its add was lost, e.g. to a failed write
+            return
+        if op == "update":
+            tasks[task_id].update(entry["fields"])
+        elif op == "delete":
+            del tasks[task_id]
+    
+    def append(self, op, **fields):
+        """Queue one change for the writer thread.
+        
+        The fields are serialized when written, so they must not be mutated
+        afterwards; pass copies of live task dicts.
+        """
+        if self.read_only:
+            return
+        self.pending.put(dict(fields, op=op))
+    
+    def disable(self):
+        """Never write to files that failed to load; appending could bury what is in them"""
+        self.read_only = True
+        with self.pending.mutex:
+            self.pending.queue.clear()
+    
+    def start(self):
+        """Start the writer thread; call once the tasks have been loaded"""
+        if self.read_only:
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        stopping = False
+        while not stopping:
+            entry = self.pending.get()
+            if entry is None:
+                break
+            batch = [entry]
+            
+            # Coalesce a burst of changes into one write
+            first = last = time.monotonic()
+            while True:
+                timeout = min(last + self.DEBOUNCE, first + self.MAX_DELAY) - time.monotonic()
+                try:
+                    entry = self.pending.get(timeout=max(timeout, 0))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+                last = time.monotonic()
+            
+            try:
+                self.write(batch)
+                if self.entries >= self.COMPACT_EVERY:
+                    self.compact()
+            except Exception as e:
+                self.error = e
+    
+    def write(self, batch):
+        """Durably append a batch of entries to the journal"""
+        if self.journal is None:
+            self.journal = open(self.journal_path, 'a')
+        self.journal.write("".join(json.dumps(dict(entry, gen=self.generation)) + "\n" for entry in batch))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.entries += len(batch)
+    
+    def compact(self):
+        """Fold the journal into the snapshot and start a new journal"""
+        self.close_journal()
+        tasks = self.load()
+        generation = self.generation + 1
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"generation": generation, "tasks": list(tasks.values())}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.generation = generation
+        
+        # Only drop the journal once the snapshot that covers it is in place
+        open(self.journal_path, 'w').close()
+        self.entries = 0
+    
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+    
+    def close(self):
+        """Write out everything still queued and stop the writer thread"""
+        if self.thread is None and not self.pending.empty():
+            # Changes made before loading finished
+            self.start()
+        if self.thread is not None:
+            self.pending.put(None)
+            self.thread.join()
+            self.thread = None
+        self.close_journal()
+
+PRIORITY_RANK = {"High": 0, "Normal": 1, "Low": 2}
+
+def task_words(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+class TaskIndex:
+    """Secondary indexes over the tasks, updated on every change.
+    
+    Filtering and search read these instead of scanning the task list: a set
+    of tasks per priority and for completed tasks, a sorted (due date, key)
+    list for date ranges, and an inverted index from words to tasks with a
+    sorted vocabulary for prefix matching. Queries return task IDs. Sorted
+    lists of the keys and of (priority rank, key) give the other two sort
+    orders, so query results come out sorted by walking them.
+    
+    It also keeps the counters behind the statistics panel: open tasks per
+    priority and overdue tasks, adjusted as each task is added or removed.
+    """
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        self.entries = {}  # task ID -> the values the task is currently indexed under
+        self.created = []
+        self.ranked = []
+        self.by_priority = {priority: set() for priority in PRIORITY_RANK}
+        self.completed = set()
+        self.due = []
+        self.undated = set()
+        self.words = {}
+        self.vocabulary = []
+        self.open_by_priority = {priority: 0 for priority in PRIORITY_RANK}
+        self.overdue = 0
+        self.today = datetime.now().strftime("%Y-%m-%d")
+    
+    @property
+    def total(self):
+        return len(self.entries)
+    
+    def is_overdue(self, completed, due_date):
+        return not completed and due_date is not None and due_date < self.today
+    
+    def set_today(self, today):
+        """Recount overdue tasks once the date has moved on"""
+        if today == self.today:
+            return
+        self.today = today
+        end = bisect_left(self.due, (today,))
+        self.overdue = sum(1 for _, key in self.due[:end] if key not in self.completed)
+    
+    def add(self, task):
+        key = task["id"]
+        entry = (task["priority"], task["completed"], task["due_date"], task_words(task["text"]))
+        priority, completed, due_date, words = entry
+        self.entries[key] = entry
+        
+        insort(self.created, key)
+        insort(self.ranked, (PRIORITY_RANK.get(priority, 1), key))
+        self.by_priority.setdefault(priority, set()).add(key)
+        if completed:
+            self.completed.add(key)
+        else:
+            self.open_by_priority[priority] = self.open_by_priority.get(priority, 0) + 1
+        if self.is_overdue(completed, due_date):
+            self.overdue += 1
+        if due_date:
+            insort(self.due, (due_date, key))
+        else:
+            self.undated.add(key)
+        for word in words:
+            keys = self.words.get(word)
+            if keys is None:
+                keys = self.words[word] = set()
+                insort(self.vocabulary, word)
+            keys.add(key)
+    
+    def remove(self, task):
+        key = task["id"]
+        priority, completed, due_date, words = self.entries.pop(key)
+        
+        del self.created[bisect_left(self.created, key)]
+        del self.ranked[bisect_left(self.ranked, (PRIORITY_RANK.get(priority, 1), key))]
+        self.by_priority[priority].discard(key)
+        self.completed.discard(key)
+        if not completed:
+            self.open_by_priority[priority] -= 1
+        if self.is_overdue(completed, due_date):
+            self.overdue -= 1
+        if due_date:
+            del self.due[bisect_left(self.due, (due_date, key))]
+        else:
+            self.undated.discard(key)
+        for word in words:
+            keys = self.words[word]
+            keys.discard(key)
+            if not keys:
+                del self.words[word]
+                del self.vocabulary[bisect_left(self.vocabulary, word)]
+    
+    def update(self, task):
+        """Re-index a task after its fields changed"""
+        self.remove(task)
+        self.add(task)
+    
+    def prefix_matches(self, prefix):
+        """Keys of tasks with a word starting with `prefix`"""
+        keys = set()
+        position = bisect_left(self.vocabulary, prefix)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            keys |= self.words[self.vocabulary[position]]
+            position += 1
+        return keys
+    
+    def query(self, text="", priority=None, completed=None, due_from=None, due_to=None,
+              undated=False, overdue=False, sort="Created"):
+        """IDs of the tasks matching every given filter, in `sort` order"""
+        candidates = []
+        if priority:
+            candidates.append(self.by_priority.get(priority, set()))
+        if completed:
+            candidates.append(self.completed)
+        if undated:
+            candidates.append(self.undated)
+        elif due_from or due_to:
+            low = bisect_left(self.due, (due_from,)) if due_from else 0
+            high = bisect_right(self.due, (due_to, float("inf"))) if due_to else len(self.due)
+            candidates.append({key for _, key in self.due[low:high]})
+        if overdue:
+            # Open tasks due before today, as counted in `overdue`
+            end = bisect_left(self.due, (self.today,))
+            candidates.append({key for _, key in self.due[:end] if key not in self.completed})
+        for term in task_words(text):
+            candidates.append(self.prefix_matches(term))
+        
+        # Intersect starting from the smallest set so the work follows the result size
+        keys = None
+        if candidates:
+            candidates.sort(key=len)
+            keys = set(candidates[0])
+            for other in candidates[1:]:
+                keys &= other
+        
+        # Walk the sorted list for the sort order, keeping the matching keys
+        if sort == "Due Date":
+            # Tasks without a due date go last
+            ordered = chain((key for _, key in self.due),
+                            (key for key in self.created if key in self.undated))
+        elif sort == "Priority":
+            ordered = (key for _, key in self.ranked)
+        else:
+            ordered = self.created
+        if completed is False:
+            return [key for key in ordered if (keys is None or key in keys) and key not in self.completed]
+        if keys is None:
+            return list(ordered)
+        return [key for key in ordered if key in keys]
+    
+    def matches(self, key, text="", priority=None, completed=None, due_from=None, due_to=None,
+                undated=False, overdue=False, sort="Created"):
+        """Whether one task passes the filters, taking the same arguments as query()"""
+        task_priority, task_completed, due_date, words = self.entries[key]
+        if priority and task_priority != priority:
+            return False
+        if completed is not None and task_completed != completed:
+            return False
+        if undated:
+            if due_date:
+                return False
+        elif due_from or due_to:
+            if not due_date or (due_from and due_date < due_from) or (due_to and due_date > due_to):
+                return False
+        if overdue and not self.is_overdue(task_completed, due_date):
+            return False
+        return all(any(word.startswith(term) for word in words) for term in task_words(text))
+    
+    def sort_key(self, key, sort):
+        """The value a task is ordered by in query results sorted by `sort`"""
+        priority, completed, due_date, words = self.entries[key]
+        # IDs increase with creation time, so they double as the "Created" order
+        if sort == "Due Date":
+            return (due_date is None, due_date or "", key)
+        if sort == "Priority":
+            return (PRIORITY_RANK.get(priority, 1), key)
+        return (key,)
+
+class TaskView:
+    """The IDs of the tasks passing a set of filters, in display order.
+    
+    Built once from TaskIndex.query and then kept current one task at a time:
+    the sort keys of the shown tasks are held in a sorted list, so a changed
+    task is moved by bisecting for its old and new positions instead of
+    running the query again.
+    """
+    def __init__(self, index, filters):
+        self.index = index
+        self.filters = filters
+        self.sort = filters["sort"]
+        self.keys = [index.sort_key(key, self.sort) for key in index.query(**filters)]
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __getitem__(self, position):
+        # Every sort key ends with the task ID
+        return self.keys[position][-1]
+    
+    def discard(self, key):
+        """Drop a task if it is shown; call while the index still has its old values"""
+        sort_key = self.index.sort_key(key, self.sort)
+        position = bisect_left(self.keys, sort_key)
+        if position < len(self.keys) and self.keys[position] == sort_key:
+            del self.keys[position]
+    
+    def add(self, key):
+        """Show a task in its sorted place if it passes the filters"""
+        if self.index.matches(key, **self.filters):
+            insort(self.keys, self.index.sort_key(key, self.sort))
+
+def task_display_text(task):
+    """Format a task's label text from its priority and due date"""
+    task_text = task["text"]
+    if task["priority"] == "High":
+        task_text = f"[HIGH] {task_text}"
+    elif task["priority"] == "Low":
+        task_text = f"[LOW] {task_text}"
+    
+    # Add due date if exists
+    if task["due_date"]:
+        task_text = f"{task_text} (Due: {task['due_date']})"
+    return task_text
+
+class TaskRow:
+    """One pooled row of widgets, rebound to whichever task it currently shows"""
+    def __init__(self, parent):
+        self.task_id = None
+        self.frame = ttk.Frame(parent, style="Task.TFrame", padding=5)
+        self.var = tk.BooleanVar(value=False)
+        self.checkbox = ttk.Checkbutton(self.frame, variable=self.var, style="Task.TCheckbutton")
+        self.checkbox.pack(side=tk.LEFT)
+        self.label = ttk.Label(self.frame, style="Task.TLabel")
+        self.label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+class VirtualTaskList(ttk.Frame):
+    """Scrollable task list that only creates widgets for the visible rows.
+    
+    A small pool of TaskRow widgets is placed over the canvas and rebound to
+    different tasks as the list scrolls, so the widget count depends on the
+    window height rather than on the number of tasks. Rows report events by
+    task ID, and `shown` maps the ID of each visible task to its row.
+    """
+    ROW_HEIGHT = 34
+    ROW_GAP = 4
+    
+    def __init__(self, parent, row_count, row_task, on_toggle, on_select, on_context_menu):
+        super().__init__(parent, style="TFrame")
+        # Callbacks into the app: the list never holds task data itself
+        self.row_count = row_count
+        self.row_task = row_task
+        self.on_toggle = on_toggle
+        self.on_select = on_select
+        self.on_context_menu = on_context_menu
+        
+        self.pitch = self.ROW_HEIGHT + self.ROW_GAP
+        self.offset = 0  # Pixels scrolled from the top of the list
+        self.selected = None  # ID of the selected task
+        self.rows = []
+        self.shown = {}
+        
+        self.canvas = tk.Canvas(self, background="#f5f5f5", highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.canvas.bind_all("<MouseWheel>", self.on_mousewheel)
+        self.canvas.bind_all("<Button-4>", lambda e: self.yview_scroll(-1, "units"))
+        self.canvas.bind_all("<Button-5>", lambda e: self.yview_scroll(1, "units"))
+    
+    def create_row(self):
+        """Create a pooled row and bind its events once"""
+        row = TaskRow(self.canvas)
+        row.checkbox.configure(command=lambda r=row: self.on_toggle(r.task_id, r.var.get()))
+        for widget in [row.frame, row.label, row.checkbox]:
+            widget.bind("<Button-3>", lambda e, r=row: self.on_context_menu(e, r.task_id))
+            widget.bind("<Button-1>", lambda e, r=row: self.on_select(r.task_id))
+        return row
+    
+    def bind_row(self, row, task):
+        """Show a task in a pooled row"""
+        row.task_id = task["id"]
+        prefix = "Complete." if task["completed"] else ""
+        row.frame.configure(style=f"{prefix}Task.TFrame",
+                            relief="raised" if task["id"] == self.selected else "solid")
+        row.checkbox.configure(style=f"{prefix}Task.TCheckbutton")
+        row.var.set(task["completed"])
+        font = ("TkDefaultFont", 10, "overstrike") if task["completed"] else ("TkDefaultFont", 10)
+        row.label.configure(text=task_display_text(task), style=f"{prefix}Task.TLabel", font=font)
+    
+    def refresh(self):
+        """Rebind the visible rows after tasks were added, removed or reordered"""
+        count = self.row_count()
+        height = max(self.canvas.winfo_height(), 1)
+        width = max(self.canvas.winfo_width() - 10, 1)
+        total = count * self.pitch
+        self.offset = min(max(self.offset, 0), max(total - height, 0))
+        
+        # Enough rows to cover the viewport plus a partly visible one at each end
+        needed = height // self.pitch + 2
+        while len(self.rows) < needed:
+            self.rows.append(self.create_row())
+        
+        first = int(self.offset // self.pitch)
+        self.shown = {}
+        for slot, row in enumerate(self.rows):
+            position = first + slot
+            if slot < needed and position < count:
+                task = self.row_task(position)
+                self.bind_row(row, task)
+                self.shown[task["id"]] = row
+                y = position * self.pitch - self.offset + self.ROW_GAP // 2
+                row.frame.place(x=5, y=y, width=width, height=self.ROW_HEIGHT)
+            else:
+                row.task_id = None
+                row.frame.place_forget()
+        
+        if total <= height:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + height) / total)
+    
+    def refresh_task(self, task):
+        """Redraw a single task in place if it is on screen"""
+        row = self.shown.get(task["id"])
+        if row is not None:
+            self.bind_row(row, task)
+    
+    def select(self, task_id):
+        """Highlight a task's row, or clear the selection with None"""
+        previous, self.selected = self.selected, task_id
+        for changed in (previous, task_id):
+            row = self.shown.get(changed)
+            if row is not None:
+                row.frame.configure(relief="raised" if changed == task_id else "solid")
+    
+    def yview(self, *args):
+        """Scrollbar callback, using the same protocol as Canvas.yview"""
+        if args[0] == "moveto":
+            self.offset = float(args[1]) * self.row_count() * self.pitch
+        elif args[0] == "scroll":
+            step = self.pitch if args[2] == "units" else self.canvas.winfo_height()
+            self.offset += int(args[1]) * step
+        self.refresh()
+    
+    def yview_scroll(self, number, what):
+        self.yview("scroll", number, what)
+    
+    def on_mousewheel(self, event):
+        """Scroll the list with the mousewheel"""
+        self.yview_scroll(int(-1*(event.delta/120)), "units")
 
 class TodoApp:
+    # Tasks added to the list per event loop turn while loading
+    LOAD_CHUNK = 2000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("To-Do List App")
@@ -13,9 +588,14 @@ class TodoApp:
         
         # Set default save file path
         self.save_file = "todo_tasks.json"
+        self.store = TaskJournal(self.save_file)
+        self.loaded = queue.Queue()
         
-        # List to store tasks
-        self.tasks = []
+        # Tasks keyed by their ID, and all IDs in ascending order, which is
+        # the order the tasks were added
+        self.tasks = {}
+        self.order = []
+        self.next_id = 1
         
         # Create main frame
         self.main_frame = ttk.Frame(self.root, padding="10")
@@ -95,21 +675,54 @@ class TodoApp:
             # If the style configuration fails, we just use the default style
             pass
         
-        # Create scrollable frame for tasks
-        self.canvas = tk.Canvas(self.main_frame, background="#f5f5f5", highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(self.main_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        self.tasks_frame = ttk.Frame(self.canvas, style="TFrame")
-        self.canvas_frame = self.canvas.create_window((0, 0), window=self.tasks_frame, anchor=tk.NW)
-        
-        # Configure canvas scrolling
-        self.tasks_frame.bind("<Configure>", self.on_frame_configure)
-        self.canvas.bind("<Configure>", self.on_canvas_configure)
-        self.canvas.bind_all("<MouseWheel>", self.on_mousewheel)
+        # Create filter bar
+        self.style.configure("Filter.TLabel", background="#f5f5f5")
+        self.filter_frame = ttk.Frame(self.main_frame, style="TFrame")
+        self.filter_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(self.filter_frame, text="Search:", style="Filter.TLabel").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(self.filter_frame, textvariable=self.search_var, width=20)
+        self.search_entry.pack(side=tk.LEFT, padx=(5, 10), fill=tk.X, expand=True)
+        # Wait for a pause in typing before searching
+        self.filter_job = None
+        self.search_var.trace_add("write", lambda *args: self.schedule_filters())
+        
+        self.filter_priority_var = tk.StringVar(value="All")
+        self.filter_status_var = tk.StringVar(value="All")
+        self.filter_due_var = tk.StringVar(value="Any Date")
+        self.sort_var = tk.StringVar(value="Created")
+        for label, variable, values in [
+            ("Priority:", self.filter_priority_var, ["All", "High", "Normal", "Low"]),
+            ("Status:", self.filter_status_var, ["All", "Active", "Completed"]),
+            ("Due:", self.filter_due_var, ["Any Date", "Overdue", "Today", "Next 7 Days", "No Due Date"]),
+            ("Sort:", self.sort_var, ["Created", "Due Date", "Priority"]),
+        ]:
+            ttk.Label(self.filter_frame, text=label, style="Filter.TLabel").pack(side=tk.LEFT)
+            combobox = ttk.Combobox(
+                self.filter_frame, 
+                textvariable=variable, 
+                values=values, 
+                state="readonly", 
+                width=11
+            )
+            combobox.pack(side=tk.LEFT, padx=(5, 10))
+            combobox.bind("<<ComboboxSelected>>", lambda e: self.apply_filters())
+        
+        # Indexes behind the filters, and the IDs of the tasks currently shown
+        self.index = TaskIndex()
+        self.view = self.order
+        
+        # Create the task list; it only builds widgets for the visible rows
+        self.task_list = VirtualTaskList(
+            self.main_frame,
+            row_count=lambda: len(self.view),
+            row_task=lambda position: self.tasks[self.view[position]],
+            on_toggle=self.toggle_task,
+            on_select=self.select_task,
+            on_context_menu=self.show_context_menu
+        )
+        self.task_list.pack(fill=tk.BOTH, expand=True)
         
         # Create bottom button frame
         self.button_frame = ttk.Frame(self.main_frame, style="TFrame")
@@ -131,13 +744,27 @@ class TodoApp:
         )
         self.delete_all_button.pack(side=tk.LEFT, padx=(0, 5))
         
-        # Statistics label
+        # Statistics panel
+        self.style.configure("Stats.TLabel", background="#f5f5f5")
+        self.style.configure("Overdue.Stats.TLabel", foreground="#c62828")
+        self.stats_frame = ttk.Frame(self.button_frame, style="TFrame")
+        self.stats_frame.pack(side=tk.RIGHT)
+        
         self.stats_label = ttk.Label(
-            self.button_frame, 
+            self.stats_frame, 
             text="Tasks: 0 | Completed: 0",
-            style="Task.TLabel"
+            style="Stats.TLabel"
         )
-        self.stats_label.pack(side=tk.RIGHT)
+        self.stats_label.grid(row=0, column=0, sticky="e")
+        
+        self.progress = ttk.Progressbar(self.stats_frame, length=120, maximum=100)
+        self.progress.grid(row=0, column=1, padx=(10, 0))
+        
+        self.overdue_label = ttk.Label(self.stats_frame, style="Stats.TLabel")
+        self.overdue_label.grid(row=1, column=0, sticky="e")
+        
+        self.priority_label = ttk.Label(self.stats_frame, style="Stats.TLabel")
+        self.priority_label.grid(row=1, column=1, padx=(10, 0))
         
         # Create context menu for tasks
         self.context_menu = tk.Menu(self.root, tearoff=0)
@@ -147,28 +774,17 @@ class TodoApp:
         self.context_menu.add_command(label="Change Due Date", command=self.change_selected_due_date)
         self.context_menu.add_command(label="Set Priority", command=self.change_selected_priority)
         
-        # Selected task reference
-        self.selected_task_frame = None
-        self.task_frames = []
+        # Selected task ID
+        self.selected_id = None
         
         # Load saved tasks
         self.load_tasks()
+        self.root.after(60000, self.tick_statistics)
+        self.root.after(500, self.check_store)
         
         # Bind app close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
-    def on_frame_configure(self, event):
-        """Reset the scroll region to encompass the inner frame"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-    
-    def on_canvas_configure(self, event):
-        """When the canvas is resized, resize the inner frame to match"""
-        self.canvas.itemconfig(self.canvas_frame, width=event.width)
-    
-    def on_mousewheel(self, event):
-        """Scroll the canvas with the mousewheel"""
-        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-    
     def set_due_date(self):
         """Open a dialog to set a due date"""
         current_date = self.due_date_var.get()
@@ -201,6 +817,7 @@ class TodoApp:
         
         # Create a new task
         task = {
+            "id": self.next_id,
             "text": task_text,
             "completed": False,
             "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -209,10 +826,16 @@ class TodoApp:
         }
         
         # Add to tasks list
-        self.tasks.append(task)
+        self.next_id += 1
+        self.tasks[task["id"]] = task
+        self.order.append(task["id"])
+        self.index.add(task)
+        self.record("add", task=dict(task))
         
         # Add task to UI
-        self.create_task_frame(task, len(self.tasks) - 1)
+        if self.view is not self.order:
+            self.view.add(task["id"])
+        self.task_list.refresh()
         
         # Clear entry and reset defaults
         self.task_entry.delete(0, tk.END)
@@ -222,102 +845,47 @@ class TodoApp:
         # Update statistics
         self.update_statistics()
     
-    def create_task_frame(self, task, index):
-        """Create a frame for a task and add it to the UI"""
-        frame_style = "Complete.Task.TFrame" if task["completed"] else "Task.TFrame"
-        task_frame = ttk.Frame(self.tasks_frame, style=frame_style, padding=5)
-        task_frame.pack(fill=tk.X, pady=2, padx=5)
-        task_frame.index = index  # Store the task index
-        
-        # Checkbox for completion status
-        checkbox_style = "Complete.Task.TCheckbutton" if task["completed"] else "Task.TCheckbutton"
-        check_var = tk.BooleanVar(value=task["completed"])
-        checkbox = ttk.Checkbutton(
-            task_frame, 
-            variable=check_var,
-            style=checkbox_style,
-            command=lambda idx=index, var=check_var: self.toggle_task(idx, var)
-        )
-        checkbox.pack(side=tk.LEFT)
-        
-        # Task content
-        label_style = "Complete.Task.TLabel" if task["completed"] else "Task.TLabel"
-        
-        # Format task text based on priority
-        task_text = task["text"]
-        if task["priority"] == "High":
-            task_text = f"[HIGH] {task_text}"
-        elif task["priority"] == "Low":
-            task_text = f"[LOW] {task_text}"
-        
-        # Add due date if exists
-        if task["due_date"]:
-            task_text = f"{task_text} (Due: {task['due_date']})"
-        
-        task_label = ttk.Label(
-            task_frame, 
-            text=task_text,
-            style=label_style
-        )
-        task_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        
-        # If completed, strike-through the text
-        if task["completed"]:
-            task_label.configure(font=("TkDefaultFont", 10, "overstrike"))
-        
-        # Bind events for context menu
-        for widget in [task_frame, task_label, checkbox]:
-            widget.bind("<Button-3>", lambda e, tf=task_frame: self.show_context_menu(e, tf))
-            widget.bind("<Button-1>", lambda e, tf=task_frame: self.select_task(tf))
-        
-        # Add to task frames list
-        self.task_frames.append(task_frame)
-        
-        return task_frame
-    
-    def select_task(self, task_frame):
+    def select_task(self, task_id):
         """Select a task and highlight it"""
-        # Deselect current selection if exists
-        if self.selected_task_frame:
-            self.selected_task_frame.configure(relief="solid")
-        
-        # Select the new task
-        self.selected_task_frame = task_frame
-        task_frame.configure(relief="raised")
+        self.selected_id = task_id
+        self.task_list.select(task_id)
     
-    def show_context_menu(self, event, task_frame):
+    def show_context_menu(self, event, task_id):
         """Show the context menu for a task"""
-        self.select_task(task_frame)
+        self.select_task(task_id)
         self.context_menu.tk_popup(event.x_root, event.y_root)
     
-    def toggle_task(self, index, var):
+    def task_changed(self, task):
+        """Re-index a changed task and redraw it, moving it within a filtered view"""
+        if self.view is self.order:
+            self.index.update(task)
+            self.task_list.refresh_task(task)
+        else:
+            self.view.discard(task["id"])
+            self.index.update(task)
+            self.view.add(task["id"])
+            self.task_list.refresh()
+        
+        # Update statistics
+        self.update_statistics()
+    
+    def toggle_task(self, task_id, completed):
         """Toggle the completion status of a task"""
+        task = self.tasks[task_id]
+        
         # Update task data
-        self.tasks[index]["completed"] = var.get()
+        task["completed"] = completed
+        self.record("update", id=task_id, fields={"completed": completed})
         
         # Update UI
-        frame = self.task_frames[index]
-        label = frame.winfo_children()[1]  # The label is the second child
-        
-        if var.get():  # Task completed
-            frame.configure(style="Complete.Task.TFrame")
-            frame.winfo_children()[0].configure(style="Complete.Task.TCheckbutton")
-            label.configure(style="Complete.Task.TLabel", font=("TkDefaultFont", 10, "overstrike"))
-        else:  # Task not completed
-            frame.configure(style="Task.TFrame")
-            frame.winfo_children()[0].configure(style="Task.TCheckbutton")
-            label.configure(style="Task.TLabel", font=("TkDefaultFont", 10))
-        
-        # Update statistics
-        self.update_statistics()
+        self.task_changed(task)
     
     def edit_selected_task(self):
         """Edit the selected task"""
-        if not self.selected_task_frame:
+        if self.selected_id is None:
             return
         
-        index = self.selected_task_frame.index
-        task = self.tasks[index]
+        task = self.tasks[self.selected_id]
         
         # Show dialog to edit task
         new_text = simpledialog.askstring(
@@ -329,33 +897,38 @@ class TodoApp:
         if new_text and new_text.strip():
             # Update task data
             task["text"] = new_text.strip()
+            self.record("update", id=task["id"], fields={"text": task["text"]})
             
             # Update UI
-            self.refresh_tasks()
+            self.task_changed(task)
     
     def delete_selected_task(self):
         """Delete the selected task"""
-        if not self.selected_task_frame:
+        if self.selected_id is None:
             return
         
-        index = self.selected_task_frame.index
+        task = self.tasks.pop(self.selected_id)
         
-        # Remove task from data
-        self.tasks.pop(index)
+        # Remove task from data; the IDs are sorted, so bisect for its position
+        del self.order[bisect_left(self.order, task["id"])]
+        if self.view is not self.order:
+            self.view.discard(task["id"])
+        self.index.remove(task)
+        self.record("delete", id=task["id"])
         
         # Reset selected task
-        self.selected_task_frame = None
+        self.select_task(None)
         
         # Update UI
-        self.refresh_tasks()
+        self.task_list.refresh()
+        self.update_statistics()
     
     def change_selected_due_date(self):
         """Change the due date of the selected task"""
-        if not self.selected_task_frame:
+        if self.selected_id is None:
             return
         
-        index = self.selected_task_frame.index
-        task = self.tasks[index]
+        task = self.tasks[self.selected_id]
         
         # Get current due date
         current_date = task["due_date"] if task["due_date"] else "No Due Date"
@@ -380,17 +953,17 @@ class TodoApp:
         else:
             # User cancelled, set to None
             task["due_date"] = None
+        self.record("update", id=task["id"], fields={"due_date": task["due_date"]})
         
         # Update UI
-        self.refresh_tasks()
+        self.task_changed(task)
     
     def change_selected_priority(self):
         """Change the priority of the selected task"""
-        if not self.selected_task_frame:
+        if self.selected_id is None:
             return
         
-        index = self.selected_task_frame.index
-        task = self.tasks[index]
+        task = self.tasks[self.selected_id]
         
         # Show dialog to set new priority
         new_priority = simpledialog.askstring(
@@ -401,11 +974,12 @@ class TodoApp:
         
         if new_priority and new_priority in ["Low", "Normal", "High"]:
             task["priority"] = new_priority
-            self.refresh_tasks()
+            self.record("update", id=task["id"], fields={"priority": new_priority})
+            self.task_changed(task)
     
     def clear_completed(self):
         """Remove all completed tasks"""
-        if not any(task["completed"] for task in self.tasks):
+        if not self.index.completed:
             return
         
         confirm = messagebox.askyesno(
@@ -415,10 +989,13 @@ class TodoApp:
         
         if confirm:
             # Remove completed tasks
-            self.tasks = [task for task in self.tasks if not task["completed"]]
+            for task_id in list(self.index.completed):
+                self.index.remove(self.tasks.pop(task_id))
+            self.order = [task_id for task_id in self.order if task_id in self.tasks]
+            self.record("clear_completed")
             
             # Reset selected task
-            self.selected_task_frame = None
+            self.select_task(None)
             
             # Update UI
             self.refresh_tasks()
@@ -435,57 +1012,166 @@ class TodoApp:
         
         if confirm:
             # Clear tasks list
-            self.tasks = []
+            self.tasks = {}
+            self.order = []
+            self.index.clear()
+            self.record("delete_all")
             
             # Reset selected task
-            self.selected_task_frame = None
+            self.select_task(None)
             
             # Update UI
             self.refresh_tasks()
     
+    def schedule_filters(self):
+        """Apply the filters once typing in the search box pauses"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(150, self.apply_filters)
+    
+    def current_filters(self):
+        """Translate the filter bar into TaskIndex.query arguments, or None if nothing is filtered"""
+        filters = {"text": self.search_var.get().strip(), "sort": self.sort_var.get()}
+        if self.filter_priority_var.get() != "All":
+            filters["priority"] = self.filter_priority_var.get()
+        if self.filter_status_var.get() != "All":
+            filters["completed"] = self.filter_status_var.get() == "Completed"
+        
+        today = datetime.now().date()
+        due = self.filter_due_var.get()
+        if due == "Overdue":
+            # Combines with the status filter: completed tasks are never overdue
+            filters["overdue"] = True
+        elif due == "Today":
+            filters["due_from"] = filters["due_to"] = today.strftime("%Y-%m-%d")
+        elif due == "Next 7 Days":
+            filters["due_from"] = today.strftime("%Y-%m-%d")
+            filters["due_to"] = (today + timedelta(days=6)).strftime("%Y-%m-%d")
+        elif due == "No Due Date":
+            filters["undated"] = True
+        
+        if len(filters) == 2 and not filters["text"] and filters["sort"] == "Created":
+            return None
+        return filters
+    
+    def apply_filters(self):
+        """Rebuild the view from the indexes and redraw the list"""
+        self.filter_job = None
+        self.index.set_today(datetime.now().strftime("%Y-%m-%d"))
+        filters = self.current_filters()
+        self.view = self.order if filters is None else TaskView(self.index, filters)
+        self.task_list.refresh()
+    
     def refresh_tasks(self):
         """Refresh the tasks display"""
-        # Clear existing task frames
-        for frame in self.task_frames:
-            frame.destroy()
-        
-        self.task_frames = []
-        
-        # Recreate all task frames
-        for i, task in enumerate(self.tasks):
-            self.create_task_frame(task, i)
+        # Only the rows currently on screen are rebuilt
+        self.apply_filters()
         
         # Update statistics
         self.update_statistics()
     
     def update_statistics(self):
-        """Update statistics display"""
-        total = len(self.tasks)
-        completed = sum(1 for task in self.tasks if task["completed"])
-        
-        self.stats_label.configure(text=f"Tasks: {total} | Completed: {completed}")
+        """Update statistics display from the index counters, without scanning the tasks"""
+        index = self.index
+        index.set_today(datetime.now().strftime("%Y-%m-%d"))
+        total = index.total
+        completed = len(index.completed)
+        percent = completed * 100 // total if total else 0
+        
+        self.stats_label.configure(text=f"Tasks: {total} | Completed: {completed} ({percent}%)")
+        self.progress.configure(value=percent)
+        self.overdue_label.configure(
+            text=f"Overdue: {index.overdue}",
+            style="Overdue.Stats.TLabel" if index.overdue else "Stats.TLabel"
+        )
+        self.priority_label.configure(text="Open: " + " | ".join(
+            f"{priority} {index.open_by_priority.get(priority, 0)}" for priority in PRIORITY_RANK
+        ))
+    
+    def tick_statistics(self):
+        """Keep the overdue count and date filters current when the date changes while the app is open"""
+        today = self.index.today
+        self.update_statistics()
+        if self.index.today != today and self.view is not self.order:
+            self.apply_filters()
+        self.root.after(60000, self.tick_statistics)
+    
+    def record(self, op, **fields):
+        """Hand one change to the background writer"""
+        self.store.append(op, **fields)
+    
+    def check_store(self):
+        """Report errors from the writer thread"""
+        if self.store.error is not None:
+            error, self.store.error = self.store.error, None
+            messagebox.showerror("Error", f"Could not save tasks: {error}")
+        self.root.after(500, self.check_store)
     
     def save_tasks(self):
         """Save tasks to file"""
+        # Blocks until the writer has flushed every queued change
+        self.store.close()
+        if self.store.error is not None:
+            messagebox.showerror("Error", f"Could not save tasks: {self.store.error}")
+    
+    def set_loading(self, loading):
+        """Disable the controls that need the full task list while it loads"""
+        state = ["disabled"] if loading else ["!disabled"]
+        for widget in [self.task_entry, self.add_button, self.clear_button, self.delete_all_button]:
+            widget.state(state)
+    
+    def load_tasks(self):
+        """Load tasks from file without blocking the window"""
+        self.set_loading(True)
+        self.stats_label.configure(text="Loading tasks...")
+        threading.Thread(target=self.read_tasks, daemon=True).start()
+        self.root.after(50, self.poll_loaded)
+    
+    def read_tasks(self):
+        """Read and parse the task file on a background thread"""
         try:
-            with open(self.save_file, 'w') as f:
-                json.dump(self.tasks, f)
+            self.loaded.put(self.store.load())
         except Exception as e:
-            messagebox.showerror("Error", f"Could not save tasks: {e}")
+            self.loaded.put(e)
     
-    def load_tasks(self):
-        """Load tasks from file"""
-        if not os.path.exists(self.save_file):
+    def poll_loaded(self):
+        """Wait for the background read, then start filling the list"""
+        try:
+            result = self.loaded.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self.poll_loaded)
             return
         
-        try:
-            with open(self.save_file, 'r') as f:
-                self.tasks = json.load(f)
-            
-            # Rebuild the UI with loaded tasks
-            self.refresh_tasks()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not load tasks: {e}")
+        if isinstance(result, Exception):
+            self.store.disable()
+            messagebox.showerror("Error", f"Could not load tasks: {result}\n\nChanges will not be saved.")
+            result = {}
+        # Sorting keeps self.order ascending even if the file was reordered by hand
+        self.insert_loaded(result, sorted(result))
+    
+    def insert_loaded(self, loaded, ids, start=0):
+        """Add one chunk of loaded tasks, then yield to the event loop for the next"""
+        for task_id in ids[start:start + self.LOAD_CHUNK]:
+            task = loaded[task_id]
+            self.tasks[task_id] = task
+            self.order.append(task_id)
+            self.index.add(task)
+        
+        if start + self.LOAD_CHUNK < len(ids):
+            # The first rows show up after the first chunk. A filtered view is
+            # only queried once everything is in, not again for every chunk
+            if self.view is self.order:
+                self.task_list.refresh()
+            self.update_statistics()
+            self.stats_label.configure(text=f"Loading tasks... {len(self.order)} of {len(ids)}")
+            self.root.after(1, self.insert_loaded, loaded, ids, start + self.LOAD_CHUNK)
+            return
+        
+        self.refresh_tasks()
+        # Never reuse an ID still in the files, even one whose task is gone
+        self.next_id = max(self.order[-1] if self.order else 0, self.store.max_id) + 1
+        self.set_loading(False)
+        self.store.start()
     
     def on_close(self):
         """Handle application close"""
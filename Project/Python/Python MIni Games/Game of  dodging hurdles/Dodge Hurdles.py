@@ -1,6 +1,10 @@
 import pygame
 import time
 import random
+try:
+    import numpy as np
+except ImportError:
+    np = None
 pygame.font.init()
 
 # Window dimensions and setup
@@ -8,8 +12,9 @@ WIDTH, HEIGHT = 700, 500
 WIN = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Dodge Hurdles in Space")
 
-# Assets and scaling
-BG = pygame.transform.scale(pygame.image.load("bg.jpeg"), (WIDTH, HEIGHT))
+# Assets and scaling; converted to the display's pixel format once, so
+# blitting them never has to convert pixels again
+BG = pygame.transform.scale(pygame.image.load("bg.jpeg"), (WIDTH, HEIGHT)).convert()
 
 # Player and game settings
 PLAYER_WIDTH = 40
@@ -23,6 +28,20 @@ STAR_VEL = 3
 POWER_UP_WIDTH = 30
 POWER_UP_HEIGHT = 30
 POWER_UP_DURATION = 5  # Seconds
+POWER_UP_VEL = 3
+
+# Side of a collision grid cell. Entities are filed under the cell holding
+# their top-left corner, so a query widens the player's rect up and left by
+# the largest entity size (50 px) to catch entities reaching into it; with
+# cells at least that big the widening adds just one row and column of cells
+GRID_CELL = 64
+
+# pygame 2 reports an uncovered window as WINDOWEXPOSED, pygame 1.9 only as VIDEOEXPOSE
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, getattr(pygame, 'WINDOWEXPOSED', pygame.VIDEOEXPOSE))
+
+# With more sprites than this on screen, repainting the whole frame is
+# cheaper than erasing and updating each sprite's rect
+DIRTY_RECT_LIMIT = 200
 
 FONT = pygame.font.SysFont("comicsans", 30)
 
@@ -34,12 +53,255 @@ BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 PLAYER_COLORS = [RED, BLUE, GREEN, YELLOW]  # Available colors
 
+# Sprites, drawn once here and then only blitted
+STAR_IMAGE = pygame.Surface((STAR_WIDTH, STAR_HEIGHT)).convert()
+STAR_IMAGE.fill(WHITE)
+POWER_UP_IMAGE = pygame.Surface((POWER_UP_WIDTH, POWER_UP_HEIGHT), pygame.SRCALPHA)
+pygame.draw.ellipse(POWER_UP_IMAGE, GREEN, POWER_UP_IMAGE.get_rect())
+POWER_UP_IMAGE = POWER_UP_IMAGE.convert_alpha()
+
+# Rendered text, kept per slot and rendered again only when its text or
+# colour changes
+class TextCache:
+    def __init__(self, font):
+        self.font = font
+        self.surfaces = {}
+
+    def render(self, slot, text, color):
+        cached = self.surfaces.get(slot)
+        if cached is None or cached[0] != (text, color):
+            cached = (text, color), self.font.render(text, 1, color).convert_alpha()
+            self.surfaces[slot] = cached
+        return cached[1]
+
+TEXT = TextCache(FONT)
+
+# Draws a frame onto the window and pushes only what changed to the screen.
+# Every rect drawn is remembered, so the next frame can erase it by copying
+# the background back over it and update the old and new rects together.
+# When there are too many sprites for that to pay off, the whole background
+# is blitted and the whole screen updated. `timings` holds the seconds spent
+# in each phase of the last frame.
+class Renderer:
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        # Rects drawn last frame, or None when the screen must be repainted
+        self.previous = None
+        self.drawn = []
+        # Whether this frame repaints everything, and whether it keeps its rects
+        self.full = True
+        self.tracking = False
+        self.timings = {}
+        self.started = self.marked = 0
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.timings[phase] = now - self.marked
+        self.marked = now
+
+    def begin(self, full=False):
+        self.started = self.marked = time.perf_counter()
+        self.timings = {}
+        self.tracking = not full
+        self.full = full or self.previous is None
+        if self.full:
+            self.surface.blit(self.background, (0, 0))
+        else:
+            self.surface.blits([(self.background, rect, rect) for rect in self.previous], doreturn=False)
+        self.drawn = []
+        self.mark('clear')
+
+    def blit(self, image, position):
+        self.drawn.append(self.surface.blit(image, position))
+
+    def rect(self, color, rect):
+        self.drawn.append(pygame.draw.rect(self.surface, color, rect))
+
+    # One blits() call for many copies of the same image
+    def sprites(self, image, positions):
+        rects = self.surface.blits([(image, position) for position in positions], doreturn=self.tracking)
+        if self.tracking:
+            self.drawn.extend(rects)
+
+    def present(self):
+        if self.full:
+            pygame.display.update()
+        else:
+            pygame.display.update(self.previous + self.drawn)
+        self.previous = self.drawn if self.tracking else None
+        self.mark('present')
+        self.timings['total'] = self.marked - self.started
+
+# Uniform grid over the screen for broad-phase collisions: each cell holds
+# the indices of the entities whose top-left corner lies in it
+class SpatialGrid:
+    def __init__(self, cell_size=GRID_CELL):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell_of(self, x, y):
+        return x // self.cell_size, y // self.cell_size
+
+    def add(self, cell, index):
+        self.cells.setdefault(cell, set()).add(index)
+
+    def discard(self, cell, index):
+        bucket = self.cells[cell]
+        bucket.discard(index)
+        if not bucket:
+            del self.cells[cell]
+
+    # Indices of entities up to reach_x/reach_y wide/tall that may overlap rect
+    def query(self, rect, reach_x, reach_y):
+        left, top = self.cell_of(rect.left - reach_x, rect.top - reach_y)
+        right, bottom = self.cell_of(rect.right, rect.bottom)
+        found = []
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                found.extend(self.cells.get((cx, cy), ()))
+        return found
+
+# All the stars (or power-ups) on screen, packed densely in a list. Despawning
+# swaps the last entity into the hole instead of shifting everything down,
+# and the grid is kept in step as entities fall from one row of cells to the next.
+class EntityPool:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rects = []
+        # Grid cell of each rect
+        self.columns = []
+        self.rows = []
+        self.grid = SpatialGrid()
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __iter__(self):
+        return iter(self.rects)
+
+    # Where to draw each entity; a Rect works as a blit destination
+    def positions(self):
+        return self.rects
+
+    def spawn(self, x, y):
+        column, row = self.grid.cell_of(x, y)
+        self.grid.add((column, row), len(self.rects))
+        self.rects.append(pygame.Rect(x, y, self.width, self.height))
+        self.columns.append(column)
+        self.rows.append(row)
+
+    def despawn(self, index):
+        grid, columns, rows = self.grid, self.columns, self.rows
+        last = len(self.rects) - 1
+        grid.discard((columns[index], rows[index]), index)
+        if index != last:
+            grid.discard((columns[last], rows[last]), last)
+            grid.add((columns[last], rows[last]), index)
+            self.rects[index] = self.rects[last]
+            columns[index] = columns[last]
+            rows[index] = rows[last]
+        self.rects.pop()
+        columns.pop()
+        rows.pop()
+
+    # Move everything down by dy and despawn what falls below `bottom`;
+    # returns how many fell off
+    def move_all(self, dy, bottom):
+        grid, rects, columns, rows = self.grid, self.rects, self.columns, self.rows
+        cell_size = grid.cell_size
+        fallen = 0
+        # Backwards, so the entity swapped into a hole has already moved
+        for index in range(len(rects) - 1, -1, -1):
+            rect = rects[index]
+            rect.y += dy
+            y = rect.y
+            if y > bottom:
+                self.despawn(index)
+                fallen += 1
+                continue
+            # Only the row can change, and only every few frames
+            row = y // cell_size
+            if row != rows[index]:
+                grid.discard((columns[index], rows[index]), index)
+                grid.add((columns[index], row), index)
+                rows[index] = row
+        return fallen
+
+    # Indices of entities overlapping rect, highest first so they can be
+    # despawned in order
+    def colliding(self, rect):
+        candidates = self.grid.query(rect, self.width, self.height)
+        return sorted((index for index in candidates if self.rects[index].colliderect(rect)), reverse=True)
+
+# The same interface as EntityPool, but positions are kept as NumPy arrays
+# (one for x, one for y) so each frame's movement, culling and collision
+# test is a handful of vector operations however many entities there are
+class ArrayPool:
+    def __init__(self, width, height, capacity=256):
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.xs = np.zeros(capacity, dtype=np.int32)
+        self.ys = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self.count
+
+    # Rects built on the fly, for drawing
+    def __iter__(self):
+        width, height = self.width, self.height
+        for x, y in zip(self.xs[:self.count].tolist(), self.ys[:self.count].tolist()):
+            yield pygame.Rect(x, y, width, height)
+
+    def positions(self):
+        return zip(self.xs[:self.count].tolist(), self.ys[:self.count].tolist())
+
+    def spawn(self, x, y):
+        if self.count == len(self.xs):
+            self.xs = np.concatenate((self.xs, np.zeros_like(self.xs)))
+            self.ys = np.concatenate((self.ys, np.zeros_like(self.ys)))
+        self.xs[self.count] = x
+        self.ys[self.count] = y
+        self.count += 1
+
+    def despawn(self, index):
+        self.count -= 1
+        self.xs[index] = self.xs[self.count]
+        self.ys[index] = self.ys[self.count]
+
+    # Move everything down by dy and despawn what falls below `bottom`;
+    # returns how many fell off
+    def move_all(self, dy, bottom):
+        count = self.count
+        ys = self.ys[:count]
+        ys += dy
+        kept = ys <= bottom
+        kept_count = int(np.count_nonzero(kept))
+        if kept_count < count:
+            self.xs[:kept_count] = self.xs[:count][kept]
+            self.ys[:kept_count] = ys[kept]
+            self.count = kept_count
+        return count - kept_count
+
+    # Indices of entities overlapping rect, highest first so they can be
+    # despawned in order
+    def colliding(self, rect):
+        xs, ys = self.xs[:self.count], self.ys[:self.count]
+        hit = ((xs < rect.right) & (xs + self.width > rect.left)
+               & (ys < rect.bottom) & (ys + self.height > rect.top))
+        return np.flatnonzero(hit)[::-1].tolist()
+
+# Stars and power-ups go in the vectorized pool when NumPy is installed
+EntityStore = ArrayPool if np is not None else EntityPool
+
 # Draw menu
 def draw_menu(selected_color_index):
     WIN.fill(WHITE)
-    title_text = FONT.render("Dodge Hurdles in Space", 1, (0, 0, 0))
-    play_text = FONT.render("Press ENTER to Start", 1, (0, 0, 0))
-    customize_text = FONT.render("Customize Your Appearance:", 1, (0, 0, 0))
+    title_text = TEXT.render('title', "Dodge Hurdles in Space", (0, 0, 0))
+    play_text = TEXT.render('play', "Press ENTER to Start", (0, 0, 0))
+    customize_text = TEXT.render('customize', "Customize Your Appearance:", (0, 0, 0))
 
     WIN.blit(title_text, (WIDTH/2 - title_text.get_width()/2, 50))
     WIN.blit(play_text, (WIDTH/2 - play_text.get_width()/2, HEIGHT - 100))
@@ -55,41 +317,48 @@ def draw_menu(selected_color_index):
     pygame.display.update()
 
 # Draw game elements
-def draw(player, elapsed_time, stars, power_ups, level, score, shield_active):
-    WIN.blit(BG, (0, 0))
-
-    time_text = FONT.render(f"Time: {round(elapsed_time)}s", 1, WHITE)
-    level_text = FONT.render(f"Level: {level}", 1, WHITE)
-    score_text = FONT.render(f"Score: {score}", 1, WHITE)
-    shield_text = FONT.render("Shield: ON" if shield_active else "Shield: OFF", 1, GREEN if shield_active else RED)
+def draw(renderer, player, elapsed_time, stars, power_ups, level, score, shield_active):
+    renderer.begin(full=len(stars) + len(power_ups) > DIRTY_RECT_LIMIT)
 
-    WIN.blit(time_text, (10, 10))
-    WIN.blit(level_text, (WIDTH - level_text.get_width() - 10, 10))
-    WIN.blit(score_text, (10, 40))
-    WIN.blit(shield_text, (10, 70))
+    time_text = TEXT.render('time', f"Time: {round(elapsed_time)}s", WHITE)
+    level_text = TEXT.render('level', f"Level: {level}", WHITE)
+    score_text = TEXT.render('score', f"Score: {score}", WHITE)
+    shield_text = TEXT.render('shield', "Shield: ON" if shield_active else "Shield: OFF", GREEN if shield_active else RED)
 
-    pygame.draw.rect(WIN, player['color'], player['rect'])
+    renderer.blit(time_text, (10, 10))
+    renderer.blit(level_text, (WIDTH - level_text.get_width() - 10, 10))
+    renderer.blit(score_text, (10, 40))
+    renderer.blit(shield_text, (10, 70))
+    renderer.mark('hud')
 
-    for star in stars:
-        pygame.draw.rect(WIN, WHITE, star)
+    renderer.rect(player['color'], player['rect'])
+    renderer.sprites(STAR_IMAGE, stars.positions())
+    renderer.sprites(POWER_UP_IMAGE, power_ups.positions())
+    renderer.mark('sprites')
 
-    for power_up in power_ups:
-        pygame.draw.ellipse(WIN, GREEN, power_up)
-
-    pygame.display.update()
+    renderer.present()
 
 # Main menu
 def menu():
     selected_color_index = 0
+    clock = pygame.time.Clock()
+    redraw = True
     run = True
     while run:
-        draw_menu(selected_color_index)
+        # The menu only changes when a key is pressed
+        if redraw:
+            draw_menu(selected_color_index)
+            redraw = False
+        clock.tick(30)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
+            if event.type in EXPOSE_EVENTS:
+                redraw = True
             if event.type == pygame.KEYDOWN:
+                redraw = True
                 if event.key == pygame.K_LEFT and selected_color_index > 0:
                     selected_color_index -= 1
                 if event.key == pygame.K_RIGHT and selected_color_index < len(PLAYER_COLORS) - 1:
@@ -116,13 +385,15 @@ def main(player_color):
     star_count = 0
 
     # Stars and power-ups
-    stars = []
-    power_ups = []
+    stars = EntityStore(STAR_WIDTH, STAR_HEIGHT)
+    power_ups = EntityStore(POWER_UP_WIDTH, POWER_UP_HEIGHT)
     power_up_timer = 0
 
     # Shield state
     shield_active = False
 
+    renderer = Renderer(WIN, BG)
+
     while run:
         star_count += clock.tick(60)
         elapsed_time = time.time() - start_time
@@ -137,21 +408,23 @@ def main(player_color):
         if star_count > star_add_increment:
             for _ in range(3 + level // 2):  # Increase stars as levels progress
                 star_x = random.randint(0, WIDTH - STAR_WIDTH)
-                star = pygame.Rect(star_x, -STAR_HEIGHT, STAR_WIDTH, STAR_HEIGHT)
-                stars.append(star)
+                stars.spawn(star_x, -STAR_HEIGHT)
             star_count = 0
 
         # Add power-ups occasionally
         if random.randint(1, 300) == 1:  # Random chance to spawn a power-up
             power_up_x = random.randint(0, WIDTH - POWER_UP_WIDTH)
-            power_up = pygame.Rect(power_up_x, -POWER_UP_HEIGHT, POWER_UP_WIDTH, POWER_UP_HEIGHT)
-            power_ups.append(power_up)
+            power_ups.spawn(power_up_x, -POWER_UP_HEIGHT)
 
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
                 break
+            # Shown again after being covered or minimised: the screen outside
+            # the dirty rects is stale, so push the whole next frame
+            if event.type in EXPOSE_EVENTS:
+                renderer.previous = None
 
         # Player movement
         keys = pygame.key.get_pressed()
@@ -161,38 +434,32 @@ def main(player_color):
             player['rect'].x += PLAYER_VEL
 
         # Update stars
-        for star in stars[:]:
-            star.y += star_velocity
-            if star.y > HEIGHT:
-                stars.remove(star)
-                score += 1  # Increase score for dodged stars
-            elif star.y + star.height >= player['rect'].y and star.colliderect(player['rect']):
-                if shield_active:
-                    stars.remove(star)  # Destroy star if shield is active
-                else:
-                    lost_text = FONT.render("You Lost!", 1, WHITE)
-                    WIN.blit(lost_text, (WIDTH/2 - lost_text.get_width()/2, HEIGHT/2 - lost_text.get_height()/2))
-                    pygame.display.update()
-                    pygame.time.delay(4000)
-                    run = False
-                    break
+        score += stars.move_all(star_velocity, HEIGHT)  # Increase score for dodged stars
+        hits = stars.colliding(player['rect'])
+        if hits:
+            if shield_active:
+                for index in hits:
+                    stars.despawn(index)  # Destroy star if shield is active
+            else:
+                lost_text = TEXT.render('lost', "You Lost!", WHITE)
+                WIN.blit(lost_text, (WIDTH/2 - lost_text.get_width()/2, HEIGHT/2 - lost_text.get_height()/2))
+                pygame.display.update()
+                pygame.time.delay(4000)
+                run = False
 
         # Update power-ups
-        for power_up in power_ups[:]:
-            power_up.y += 3
-            if power_up.y > HEIGHT:
-                power_ups.remove(power_up)
-            elif power_up.colliderect(player['rect']):
-                power_ups.remove(power_up)
-                shield_active = True
-                power_up_timer = time.time()
+        power_ups.move_all(POWER_UP_VEL, HEIGHT)
+        for index in power_ups.colliding(player['rect']):
+            power_ups.despawn(index)
+            shield_active = True
+            power_up_timer = time.time()
 
         # Deactivate shield after duration
         if shield_active and time.time() - power_up_timer > POWER_UP_DURATION:
             shield_active = False
 
         # Draw all elements
-        draw(player, elapsed_time, stars, power_ups, level, score, shield_active)
+        draw(renderer, player, elapsed_time, stars, power_ups, level, score, shield_active)
 
     pygame.quit()
 
@@ -0,0 +1,151 @@
+"""Frame-time benchmark for Dodge Hurdles.
+
+Keeps a screen full of falling stars at a fixed count and times each
+frame's update (movement, despawning, collisions) and draw, for the
+NumPy array pool, the plain entity pool it falls back to, and the old
+list-of-Rects loop. The draw time is split into the renderer's phases:
+clearing, HUD text, sprites and pushing the frame to the screen.
+
+    python bench.py --entities 1000,5000,20000 --frames 300
+
+    # without a display
+    SDL_VIDEODRIVER=dummy python bench.py
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_game():
+    # The game loads bg.jpeg relative to the working directory
+    os.chdir(HERE)
+    spec = importlib.util.spec_from_file_location("dodge_hurdles", os.path.join(HERE, "Dodge Hurdles.py"))
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    return game
+
+def percentiles(values):
+    """p50, p95 and p99 of `values` in milliseconds"""
+    if not values:
+        return 0.0, 0.0, 0.0
+    if len(values) == 1:
+        return (values[0] * 1000,) * 3
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+class ListStars:
+    """The per-star loop from before the entity pool, for comparison"""
+
+    def __init__(self, game):
+        self.game = game
+        self.stars = []
+
+    def spawn(self, x, y):
+        self.stars.append(self.game.pygame.Rect(x, y, self.game.STAR_WIDTH, self.game.STAR_HEIGHT))
+
+    def update(self, velocity, player):
+        dodged = 0
+        for star in self.stars[:]:
+            star.y += velocity
+            if star.y > self.game.HEIGHT:
+                self.stars.remove(star)
+                dodged += 1
+            elif star.y + star.height >= player.y and star.colliderect(player):
+                self.stars.remove(star)
+                dodged += 1
+        return dodged
+
+    def __len__(self):
+        return len(self.stars)
+
+    def positions(self):
+        return self.stars
+
+    def drawable(self):
+        return self
+
+class PoolStars:
+    """The entity pool the game uses without NumPy"""
+    store = 'EntityPool'
+
+    def __init__(self, game):
+        self.stars = getattr(game, self.store)(game.STAR_WIDTH, game.STAR_HEIGHT)
+        self.height = game.HEIGHT
+
+    def spawn(self, x, y):
+        self.stars.spawn(x, y)
+
+    def update(self, velocity, player):
+        dodged = self.stars.move_all(velocity, self.height)
+        hits = self.stars.colliding(player)
+        for index in hits:
+            self.stars.despawn(index)
+        return dodged + len(hits)
+
+    def drawable(self):
+        return self.stars
+
+class ArrayStars(PoolStars):
+    """The NumPy array pool the game uses when it can"""
+    store = 'ArrayPool'
+
+def run(game, kind, entities, frames, velocity, seed):
+    rng = random.Random(seed)
+    stars = kind(game)
+    max_x = game.WIDTH - game.STAR_WIDTH
+    for _ in range(entities):
+        stars.spawn(rng.randint(0, max_x), rng.randint(-game.STAR_HEIGHT, game.HEIGHT))
+    player = {'rect': game.pygame.Rect(200, game.HEIGHT - game.PLAYER_HEIGHT, game.PLAYER_WIDTH, game.PLAYER_HEIGHT),
+              'color': game.RED}
+    renderer = game.Renderer(game.WIN, game.BG)
+    power_ups = game.EntityPool(game.POWER_UP_WIDTH, game.POWER_UP_HEIGHT)
+
+    update_times, draw_times, phases = [], [], {}
+    for frame in range(frames):
+        started = time.perf_counter()
+        # The player sweeps back and forth; a shield is always on, so hits
+        # despawn like dodged stars and are replaced to keep the count steady
+        player['rect'].x = (frame * game.PLAYER_VEL) % (game.WIDTH - game.PLAYER_WIDTH)
+        for _ in range(stars.update(velocity, player['rect'])):
+            stars.spawn(rng.randint(0, max_x), -game.STAR_HEIGHT)
+        drawn = time.perf_counter()
+        game.draw(renderer, player, frame / 60, stars.drawable(), power_ups, 1, 0, True)
+        game.pygame.event.pump()
+        update_times.append(drawn - started)
+        draw_times.append(time.perf_counter() - drawn)
+        for phase, seconds in renderer.timings.items():
+            phases.setdefault(phase, []).append(seconds)
+    return update_times, draw_times, phases
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entities', default='100,1000,5000,20000', help="comma-separated star counts")
+    parser.add_argument('--frames', type=int, default=300, help="frames to time per run")
+    parser.add_argument('--velocity', type=int, default=8, help="star speed in pixels per frame")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for star positions")
+    args = parser.parse_args()
+
+    game = load_game()
+    print(f"{'stars':>8} {'store':>6} {'update p50':>11} {'update p95':>11} {'draw p50':>9} {'frame p95':>10}"
+          f" | p50 ms: {'clear':>6} {'hud':>6} {'sprites':>8} {'present':>8}")
+    for entities in (int(count) for count in args.entities.split(',')):
+        kinds = [('list', ListStars), ('pool', PoolStars)]
+        if game.np is not None:
+            kinds.append(('array', ArrayStars))
+        for name, kind in kinds:
+            update_times, draw_times, phases = run(game, kind, entities, args.frames, args.velocity, args.seed)
+            frame_times = [update + draw for update, draw in zip(update_times, draw_times)]
+            update_p50, update_p95, _ = percentiles(update_times)
+            clear, hud, sprites, present = (percentiles(phases[phase])[0]
+                                            for phase in ('clear', 'hud', 'sprites', 'present'))
+            print(f"{entities:>8} {name:>6} {update_p50:>11.2f} {update_p95:>11.2f} "
+                  f"{percentiles(draw_times)[0]:>9.2f} {percentiles(frame_times)[1]:>10.2f}"
+                  f" |         {clear:>6.2f} {hud:>6.2f} {sprites:>8.2f} {present:>8.2f}")
+    game.pygame.quit()
+
+if __name__ == "__main__":
+    main()